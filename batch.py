@@ -0,0 +1,218 @@
+#  d o c s t r i n g s
+"""
+Solve sudoku puzzles in bulk.
+
+Puzzles are read one per line from files or standard input, as 81 characters row by row with
+'0' or '.' for an empty square (or 256 or 625 characters for 16x16 or 25x25 boards), and are
+solved across a pool of worker processes. Each result
+is written to standard output as 'puzzle,solution', either in input order or as each puzzle
+completes:
+
+    python batch.py puzzles.txt --jobs 8 --chunksize 64
+    cat puzzles.txt | python batch.py --unordered
+
+Variant puzzles are solved with '--layout diagonal' or '--layout windoku', and jigsaw puzzles
+with '--regions' and a line giving the region of each square (see 'sudoku.namedLayout()').
+"""
+
+
+#  d e p e n d e n c i e s
+import argparse
+import multiprocessing
+import sys
+import time
+from itertools import islice
+
+from corpus import corpusWriter, readCorpus, readStream
+from sudoku import lineOrder, lineToSquares, solve_engines, layout_names, namedLayout
+from workers import poolResults, workerBoard
+
+
+#  v a r i a b l e s
+slab_chunks = 8 # chunks per worker read ahead of the pool, which bounds memory on long inputs
+worker_cache = None # solution cache of this (worker) process, set by initWorker()
+worker_layout = ('standard', None) # (layout name, jigsaw regions) of the puzzles, set by initWorker()
+
+
+#  f u n c t i o n s
+def readPuzzles(names):
+    """
+    Yield the puzzle of each line in the named corpus files, or of standard input if no files
+    are named. Any solutions already in the files are ignored.
+    """
+    if not names:
+        for puzzle, solution in readStream(sys.stdin):
+            yield puzzle
+
+    for name in names:
+        for puzzle, solution in readCorpus(name):
+            yield puzzle
+
+def chunks(items, size):
+    """
+    Yield successive lists of up to 'size' items.
+    """
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+
+        yield chunk
+
+def initWorker(cache_size=0, cache_path=None, layout='standard', regions=None):
+    """
+    Set up the solution cache of a worker process, if 'cache_size' is given, and the layout of
+    the puzzles it solves.
+    """
+    global worker_cache, worker_layout
+    worker_layout = (layout, regions)
+    if cache_size:
+        from cache import solutionCache
+
+        worker_cache = solutionCache(cache_size, cache_path)
+    else:
+        worker_cache = None
+
+def solvePuzzle(task):
+    """
+    Solve one (puzzle, engine, timeout) task, abandoning the solve after 'timeout' seconds if
+    not 'None'. Return a list of its (puzzle, solution, solved), with an empty solution if the
+    puzzle line could not be read.
+    """
+    puzzle, engine, timeout = task
+    deadline = time.time() + timeout if timeout is not None else None
+    try:
+        order = lineOrder(puzzle)
+        given_squares = lineToSquares(puzzle)
+        layout = namedLayout(worker_layout[0], order, worker_layout[1])
+        if layout.order!=order:
+            raise ValueError('puzzle and regions of different sizes')
+    except ValueError:
+        return [(puzzle, '', False)]
+
+    if worker_cache is not None and order==3 and worker_layout==('standard', None):
+        solution, solved = worker_cache.solve(given_squares, engine, deadline)
+        return [(puzzle, solution, solved)]
+
+    board = workerBoard(layout=layout)
+    board.reset(given_squares)
+    solved = board.solve(engine=engine, deadline=deadline)
+    return [(puzzle, board.line(), solved)]
+
+def solveChunk(task):
+    """
+    Solve one (puzzles, engine, timeout) task of many puzzles together with the vectorized
+    propagation, which handles 9x9 boards; larger boards are solved one by one. Return a list
+    of (puzzle, solution, solved).
+    """
+    from vectorized import solveLines
+
+    puzzles, engine, timeout = task
+    if all(len(puzzle)==81 for puzzle in puzzles):
+        return solveLines(puzzles, engine=engine, timeout=timeout)
+
+    standard = iter(solveLines([puzzle for puzzle in puzzles if len(puzzle)==81], engine=engine, timeout=timeout))
+    results = []
+    for puzzle in puzzles:
+        if len(puzzle)==81:
+            results.append(next(standard))
+        else:
+            results.extend(solvePuzzle((puzzle, engine, timeout)))
+
+    return results
+
+def solvePuzzles(puzzles, engine='dlx', jobs=None, chunksize=16, ordered=True, vectorized=False,
+                 cache_size=0, cache_path=None, timeout=None, layout='standard', regions=None):
+    """
+    Yield (puzzle, solution, solved) for each puzzle line, solved by 'jobs' worker processes
+    (default: one per CPU, or in this process if 1). Results are yielded in input order, or in
+    order of completion if 'ordered' is 'False'. Puzzles are handed to the pool in slabs so
+    that arbitrarily long inputs are never held in memory at once. If 'vectorized' is set, each
+    chunk of puzzles is propagated together with NumPy (see 'vectorized.py'). Otherwise, if
+    'cache_size' is given, each worker keeps a solution cache of that size, with an sqlite tier
+    at 'cache_path' if given (see 'cache.py'). If 'timeout' is given, a puzzle not solved within
+    that many seconds is given up, and its solution left partial. Puzzles of another 'layout'
+    than 'standard', or with jigsaw 'regions', are solved board by board without the cache.
+    """
+    if vectorized and (layout!='standard' or regions is not None):
+        raise ValueError('vectorized propagation handles standard puzzles only')
+
+    if vectorized:
+        tasks = ((chunk, engine, timeout) for chunk in chunks(puzzles, chunksize))
+        solver = solveChunk
+        chunksize = 1
+    else:
+        tasks = ((puzzle, engine, timeout) for puzzle in puzzles)
+        solver = solvePuzzle
+
+    if jobs==1:
+        initWorker(cache_size, cache_path, layout, regions)
+        for task in tasks:
+            for result in solver(task):
+                yield result
+
+        return
+
+    pool = multiprocessing.Pool(jobs, initWorker, (cache_size, cache_path, layout, regions))
+    slab_size = chunksize * slab_chunks * (jobs or multiprocessing.cpu_count())
+    for task_results in poolResults(pool, solver, tasks, chunksize, ordered, slab_size):
+        for result in task_results:
+            yield result
+
+def main(argv=None):
+    """
+    Run the batch solver from the command line. Return the exit status: 0 if every puzzle was
+    solved, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Solve sudoku puzzles in the 81 character line format.")
+    parser.add_argument('files', nargs='*', help="puzzle files, one puzzle per line (default: standard input)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="number of worker processes (default: one per CPU)")
+    parser.add_argument('-c', '--chunksize', type=int, default=16, help="puzzles sent to a worker at a time")
+    parser.add_argument('-u', '--unordered', action='store_true', help="write results as they complete rather than in input order")
+    parser.add_argument('-e', '--engine', choices=solve_engines, default='dlx', help="solve engine (default: dlx)")
+    parser.add_argument('-v', '--vectorized', action='store_true', help="propagate each chunk of puzzles together with NumPy")
+    parser.add_argument('--cache', type=int, default=0, help="solutions cached per worker, shared by equivalent puzzles")
+    parser.add_argument('--cache-file', help="sqlite file keeping cached solutions between runs")
+    parser.add_argument('-t', '--timeout', type=float, default=None, help="seconds allowed for each puzzle (default: no limit)")
+    parser.add_argument('-l', '--layout', choices=layout_names, default='standard', help="extra zones of variant puzzles (default: standard)")
+    parser.add_argument('-r', '--regions', help="jigsaw regions, a line with the same character for each square of a region")
+    args = parser.parse_args(argv)
+
+    if args.vectorized and (args.layout!='standard' or args.regions is not None):
+        parser.error('--vectorized handles standard puzzles only')
+
+    if args.regions is not None:
+        try:
+            namedLayout(args.layout, regions=args.regions)
+        except ValueError, e:
+            parser.error('invalid regions: %s' % e)
+
+    n_puzzles = 0
+    n_solved = 0
+    results = solvePuzzles(readPuzzles(args.files), engine=args.engine, jobs=args.jobs,
+                           chunksize=args.chunksize, ordered=not args.unordered,
+                           vectorized=args.vectorized, cache_size=args.cache, cache_path=args.cache_file,
+                           timeout=args.timeout, layout=args.layout, regions=args.regions)
+    with corpusWriter(sys.stdout) as writer:
+        for puzzle, solution, solved in results:
+            n_puzzles += 1
+            if not solution:
+                sys.stderr.write("unreadable puzzle '%s'\n" % puzzle)
+                continue
+
+            if solved:
+                n_solved += 1
+
+            writer.write(puzzle, solution)
+
+    sys.stderr.write('solved %d of %d puzzles\n' % (n_solved, n_puzzles))
+    if n_solved==n_puzzles:
+        return 0
+    else:
+        return 1
+
+
+#  m a i n   e x e c u t i o n
+if __name__ == "__main__":
+    sys.exit(main())
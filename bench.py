@@ -0,0 +1,197 @@
+#  d o c s t r i n g s
+"""
+Benchmark the solver.
+
+Each corpus of puzzles is timed for board construction, solve() and each strategy phase, and
+reported as puzzles per second, latency percentiles and peak memory. Every corpus runs in a
+fresh process, so that its peak memory is its own rather than the largest so far. The corpora
+are the example puzzles in 'sudoku.py', random equivalent variants of each of them (so
+grouped by difficulty), and any corpus files given on the command line. Results can be saved
+as a JSON baseline and later runs compared against it:
+
+    python bench.py --variants 200 --save baseline.json
+    python bench.py --variants 200 --compare baseline.json
+"""
+
+
+#  d e p e n d e n c i e s
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import time
+
+from corpus import readPuzzles
+from instrument import statisticsObserver
+from latency import latency_percentiles, percentile
+from sudoku import sudokuBoard, example_puzzles, solve_engines
+from symmetry import randomTransform, transformSquares
+from workers import poolResults
+
+
+#  f u n c t i o n s
+def exampleCorpora(n_variants=0, seed=0):
+    """
+    Return a list of (name, puzzles) corpora: each example puzzle alone and, if 'n_variants' is
+    given, that many random equivalent variants of it, drawn from a generator seeded with 'seed'.
+    """
+    rng = random.Random(seed)
+    corpora = []
+    for name, given_squares in example_puzzles:
+        corpora.append((name, [given_squares]))
+
+    if n_variants:
+        for name, given_squares in example_puzzles:
+            variants = [transformSquares(given_squares, randomTransform(rng)) for i in range(n_variants)]
+            corpora.append(('%s-variants' % name, variants))
+
+    return corpora
+
+def timePuzzle(given_squares, engine='dlx'):
+    """
+    Construct and solve one board. Return (solved, timings), with the seconds spent in
+    construction, solve() and each strategy phase.
+    """
+    observer = statisticsObserver()
+    start = time.time()
+    board = sudokuBoard(given_squares, observer=observer)
+    construct = time.time() - start
+
+    start = time.time()
+    solved = board.solve(engine=engine)
+    timings = dict(observer.seconds)
+    timings['construct'] = construct
+    timings['solve'] = time.time() - start
+    return solved, timings
+
+def benchCorpus(puzzles, engine='dlx', repeat=1):
+    """
+    Return the benchmark statistics of a list of puzzles, each solved 'repeat' times.
+    """
+    latencies = []
+    totals = {}
+    n_solved = 0
+    start = time.time()
+    for r in range(repeat):
+        for given_squares in puzzles:
+            solved, timings = timePuzzle(given_squares, engine)
+            n_solved += solved
+            latencies.append(timings['construct'] + timings['solve'])
+            for name in timings.keys():
+                totals[name] = totals.get(name, 0.0) + timings[name]
+
+    elapsed = time.time() - start
+    latencies.sort()
+    n_runs = len(latencies)
+
+    stats = {'puzzles' : len(puzzles),
+             'runs' : n_runs,
+             'solved' : n_solved,
+             'puzzles_per_second' : n_runs / elapsed if elapsed else 0.0,
+             'peak_memory_kb' : resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    for q in latency_percentiles:
+        stats['latency_p%d' % q] = percentile(latencies, q)
+
+    stats['latency_max'] = latencies[-1] if latencies else 0.0
+    for name in totals.keys():
+        stats['mean_%s' % name] = totals[name] / n_runs
+
+    return stats
+
+def benchTask(task):
+    """
+    Return the statistics of one (puzzles, engine, repeat) task, run in a worker process of its
+    own. A board is built first, so that the board index is not built in the timings.
+    """
+    puzzles, engine, repeat = task
+    sudokuBoard({})
+    return benchCorpus(puzzles, engine, repeat)
+
+def compareResults(results, baseline, tolerance=0.1):
+    """
+    Return a list of (corpus, metric, baseline value, value) for each throughput or latency
+    which is more than 'tolerance' (a fraction) worse than the baseline.
+    """
+    regressions = []
+    for name in sorted(results.keys()):
+        if name not in baseline:
+            continue
+
+        old, new = baseline[name], results[name]
+        if new['puzzles_per_second']<old['puzzles_per_second'] * (1.0 - tolerance):
+            regressions.append((name, 'puzzles_per_second', old['puzzles_per_second'], new['puzzles_per_second']))
+
+        for metric in ['latency_p%d' % q for q in latency_percentiles]:
+            if new[metric]>old[metric] * (1.0 + tolerance):
+                regressions.append((name, metric, old[metric], new[metric]))
+
+    return regressions
+
+def formatResults(results):
+    """
+    Return the results as a text table.
+    """
+    columns = ['puzzles_per_second'] + ['latency_p%d' % q for q in latency_percentiles] + ['latency_max', 'peak_memory_kb']
+    lines = ['%-28s %8s %8s' % ('corpus', 'runs', 'solved') + ''.join(' %14s' % c.replace('latency_', '') for c in columns)]
+    for name in sorted(results.keys()):
+        stats = results[name]
+        line = '%-28s %8d %8d' % (name, stats['runs'], stats['solved'])
+        line += ' %14.1f' % stats['puzzles_per_second']
+        for c in columns[1:-1]:
+            line += ' %12.3fms' % (stats[c] * 1000.0)
+
+        line += ' %14d' % stats['peak_memory_kb']
+        lines.append(line)
+
+    return '\n'.join(lines)
+
+def main(argv=None):
+    """
+    Run the benchmarks from the command line. Return 1 if a comparison found a regression.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the sudoku solver.")
+    parser.add_argument('corpora', nargs='*', help="extra corpus files, one puzzle per line")
+    parser.add_argument('-n', '--variants', type=int, default=0, help="random variants of each example puzzle")
+    parser.add_argument('-r', '--repeat', type=int, default=1, help="times to solve each puzzle")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="seed of the variant generator")
+    parser.add_argument('-e', '--engine', choices=solve_engines, default='dlx', help="solve engine (default: dlx)")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="compare the results with this JSON baseline")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="fractional slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    corpora = exampleCorpora(args.variants, args.seed)
+    for path in args.corpora:
+        corpora.append((path, list(readPuzzles(path))))
+
+    results = {}
+    tasks = [(puzzles, args.engine, args.repeat) for name, puzzles in corpora]
+    pool = multiprocessing.Pool(1, maxtasksperchild=1) # a fresh process for each corpus
+    for (name, puzzles), stats in zip(corpora, poolResults(pool, benchTask, tasks)):
+        results[name] = stats
+
+    print formatResults(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'engine' : args.engine, 'results' : results}, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+        regressions = compareResults(results, baseline, args.tolerance)
+        for name, metric, old, new in regressions:
+            print 'regression: %s %s %.6g -> %.6g' % (name, metric, old, new)
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+#  m a i n   e x e c u t i o n
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#  d o c s t r i n g s
+"""
+A solution cache in front of 'sudokuBoard.solve()'.
+
+Each puzzle is mapped to its canonical form (see 'symmetry.canonicalForm'), so that puzzles
+which are the same up to relabelling, band/stack and row/column permutation, transposition or
+rotation share one cache entry. Solved canonical grids are held in a bounded in-memory LRU and,
+optionally, in an sqlite file which survives restarts.
+"""
+
+
+#  d e p e n d e n c i e s
+import sqlite3
+from collections import OrderedDict
+
+from sudoku import lineToSquares, squaresToLine
+from symmetry import canonicalForm, inverseTransform, transformSquares
+from workers import workerBoard
+
+
+#  c l a s s e s
+class solutionCache():
+    """
+    Canonical puzzle -> solution cache with LRU eviction and an optional sqlite tier.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self, capacity=10000, path=None):
+        """
+        The initialisation method. Up to 'capacity' solutions are held in memory; if 'path' is
+        given, every solution is also stored in the sqlite database there.
+        """
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, timeout=30)
+            self.db.execute('CREATE TABLE IF NOT EXISTS solutions (puzzle TEXT PRIMARY KEY, solution TEXT)')
+            self.db.commit()
+
+    def __remember__(self, canonical, solution):
+        """
+        Put a solution at the most recently used end of the memory tier, evicting the least
+        recently used entry if full.
+        """
+        self.entries[canonical] = solution
+        if len(self.entries)>self.capacity:
+            self.entries.popitem(last=False)
+
+    #  p u b l i c   m e t h o d s
+    def get(self, canonical):
+        """
+        Return the solution of a canonical puzzle line, or 'None' if it is not cached.
+        """
+        solution = self.entries.pop(canonical, None)
+        if solution is not None:
+            self.entries[canonical] = solution
+            self.hits += 1
+            return solution
+
+        if self.db is not None:
+            row = self.db.execute('SELECT solution FROM solutions WHERE puzzle=?', (canonical,)).fetchone()
+            if row is not None:
+                self.__remember__(canonical, str(row[0]))
+                self.disk_hits += 1
+                return str(row[0])
+
+        self.misses += 1
+        return None
+
+    def put(self, canonical, solution):
+        """
+        Store the solution of a canonical puzzle line.
+        """
+        self.__remember__(canonical, solution)
+        if self.db is not None:
+            self.db.execute('INSERT OR REPLACE INTO solutions (puzzle, solution) VALUES (?, ?)', (canonical, solution))
+            self.db.commit()
+
+    def solve(self, given_squares, engine='dlx', deadline=None):
+        """
+        Return (solution, solved) for a puzzle, as for 'sudokuBoard.solve()' with the solution as
+        an 81 character line. Only complete solutions are cached. Misses are solved on the
+        board of this process (see 'workers.workerBoard()').
+        """
+        canonical, transform = canonicalForm(given_squares)
+        solution = self.get(canonical)
+        solved = True
+        if solution is None:
+            board = workerBoard()
+            board.reset(transformSquares(given_squares, transform))
+            solved = board.solve(engine=engine, deadline=deadline)
+            solution = board.line()
+            if solved:
+                self.put(canonical, solution)
+
+        solution_squares = transformSquares(lineToSquares(solution), inverseTransform(transform))
+        return squaresToLine(solution_squares), solved
+
+    def close(self):
+        """
+        Close the sqlite tier, if any.
+        """
+        if self.db is not None:
+            self.db.close()
+            self.db = None
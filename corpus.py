@@ -0,0 +1,138 @@
+#  d o c s t r i n g s
+"""
+Streaming reader and writer for large puzzle corpora.
+
+A corpus is a text file with one puzzle per line, as 81 characters row by row with '0' or '.'
+for an empty square (256 or 625 characters for 16x16 or 25x25 boards), optionally followed by
+a comma and the solution in the same format. Blank lines, '#' comments and a header line (e.g.
+'quizzes,solutions') are skipped. Files are read lazily through 'mmap', so corpora larger than
+memory can be streamed.
+"""
+
+
+#  d e p e n d e n c i e s
+import mmap
+import os
+
+from sudoku import lineToSquares, board_orders
+
+
+#  v a r i a b l e s
+line_lengths = [order ** 4 for order in board_orders] # a header line has letters but not these lengths
+
+
+#  f u n c t i o n s
+def parseLine(line):
+    """
+    Return the (puzzle, solution) of a corpus line, with solution 'None' if absent, or 'None' if
+    the line holds no puzzle.
+    """
+    line = line.strip()
+    if not line or line[0]=='#':
+        return None
+
+    fields = line.split(',')
+    if line[0].isalpha() and len(fields[0].strip()) not in line_lengths:
+        return None
+
+    if len(fields)>1 and fields[1]:
+        return fields[0].strip(), fields[1].strip()
+    else:
+        return fields[0].strip(), None
+
+def readStream(stream):
+    """
+    Yield (puzzle, solution) for each puzzle line of an open file, such as standard input.
+    """
+    for line in stream:
+        entry = parseLine(line)
+        if entry is not None:
+            yield entry
+
+def readCorpus(path):
+    """
+    Yield (puzzle, solution) for each puzzle line of the file at 'path', memory-mapping the file
+    rather than reading it in.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size==0:
+            return
+
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            readline = mm.readline
+            line = readline()
+            while line:
+                entry = parseLine(line)
+                if entry is not None:
+                    yield entry
+
+                line = readline()
+        finally:
+            mm.close()
+
+def readPuzzles(path):
+    """
+    Yield the given squares of each puzzle in the file at 'path', in the form expected by
+    'sudokuBoard': {(x, y) : [value]}
+    """
+    for puzzle, solution in readCorpus(path):
+        yield lineToSquares(puzzle)
+
+
+#  c l a s s e s
+class corpusWriter():
+    """
+    Buffered writer of corpus lines, to a path or an open file.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self, target, buffer_lines=4096):
+        """
+        The initialisation method. Lines are written out 'buffer_lines' at a time.
+        """
+        if isinstance(target, str):
+            self.stream = open(target, 'w')
+            self.owned = True
+        else:
+            self.stream = target
+            self.owned = False
+
+        self.buffer_lines = buffer_lines
+        self.lines = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    #  p u b l i c   m e t h o d s
+    def write(self, puzzle, solution=None):
+        """
+        Add a puzzle line, with its solution if given.
+        """
+        if solution is None:
+            self.lines.append(puzzle + '\n')
+        else:
+            self.lines.append(puzzle + ',' + solution + '\n')
+
+        if len(self.lines)>=self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        """
+        Write out the buffered lines.
+        """
+        if self.lines:
+            self.stream.write(''.join(self.lines))
+            self.lines = []
+
+        self.stream.flush()
+
+    def close(self):
+        """
+        Write out the buffered lines, closing the file if it was opened by this writer.
+        """
+        self.flush()
+        if self.owned:
+            self.stream.close()
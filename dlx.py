@@ -0,0 +1,214 @@
+#  d o c s t r i n g s
+"""
+An exact cover solver, using Knuth's Dancing Links (algorithm X on circular doubly linked lists).
+"""
+
+
+#  c l a s s e s
+class exactCover():
+    """
+    A sparse 0/1 matrix of constraint columns and candidate rows. The nodes are held in flat
+    integer lists: node 0 is the root, nodes 1..n_columns are the column headers and the
+    remaining nodes are the 1s of the matrix.
+
+    Primary columns must be covered exactly once, secondary columns at most once. The headers
+    of secondary columns are left out of the list of columns to choose from, linked only to
+    themselves, so a solution may leave them uncovered, but the rows which cover them are
+    still removed with them.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self, n_columns, rows, n_primary=None):
+        """
+        The initialisation method. 'rows' is a list of lists of the column indices
+        (0..n_columns-1) covered by each row. The first 'n_primary' columns (default: all of
+        them) are primary and the rest secondary.
+        """
+        if n_primary is None:
+            n_primary = n_columns
+
+        self.n_columns = n_columns
+        self.left = [n_primary] + list(range(n_primary)) + list(range(n_primary + 1, n_columns + 1))
+        self.right = list(range(1, n_primary + 1)) + [0] + list(range(n_primary + 1, n_columns + 1))
+        self.up = list(range(n_columns + 1))
+        self.down = list(range(n_columns + 1))
+        self.column = list(range(n_columns + 1))
+        self.row = [-1] * (n_columns + 1)
+        self.size = [0] * (n_columns + 1)
+
+        for r in range(len(rows)):
+            self.__addRow__(r, rows[r])
+
+    def __addRow__(self, r, columns):
+        """
+        Append row 'r' covering the given column indices.
+        """
+        first = None
+        for c in columns:
+            c += 1
+            node = len(self.column)
+            self.column.append(c)
+            self.row.append(r)
+
+            # link into the bottom of the column
+            self.up.append(self.up[c])
+            self.down.append(c)
+            self.down[self.up[c]] = node
+            self.up[c] = node
+            self.size[c] += 1
+
+            # link into the end of the row
+            if first is None:
+                first = node
+                self.left.append(node)
+                self.right.append(node)
+            else:
+                self.left.append(self.left[first])
+                self.right.append(first)
+                self.right[self.left[first]] = node
+                self.left[first] = node
+
+    def __cover__(self, c):
+        """
+        Remove column 'c' and every row which covers it.
+        """
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i!=c:
+            j = right[i]
+            while j!=i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def __uncover__(self, c):
+        """
+        Restore column 'c' and every row which covers it, in reverse order of removal.
+        """
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+
+        i = up[c]
+        while i!=c:
+            j = left[i]
+            while j!=i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    def __chooseColumn__(self):
+        """
+        Return the uncovered column with the fewest rows, or 0 if all columns are covered.
+        """
+        right, size = self.right, self.size
+        best = 0
+        best_size = len(self.column)
+        c = right[0]
+        while c!=0:
+            if size[c]<best_size:
+                best = c
+                best_size = size[c]
+                if best_size<2:
+                    break
+            c = right[c]
+
+        return best
+
+    def __undoRow__(self, r):
+        """
+        Restore the columns covered when row node 'r' was chosen.
+        """
+        j = self.left[r]
+        while j!=r:
+            self.__uncover__(self.column[j])
+            j = self.left[j]
+
+    def __doRow__(self, r):
+        """
+        Cover the other columns of row node 'r'.
+        """
+        j = self.right[r]
+        while j!=r:
+            self.__cover__(self.column[j])
+            j = self.right[j]
+
+    #  p u b l i c   m e t h o d s
+    def solutions(self, node_check=None):
+        """
+        Yield each exact cover as a list of row indices. The matrix is restored when the
+        search is exhausted or the generator is closed early. 'node_check', if given, is called
+        before each row is tried and may raise an exception to abandon the search.
+        """
+        down = self.down
+        levels = [] # (column, row node) chosen at each depth of the search
+
+        c = self.__chooseColumn__()
+        if c==0:
+            yield []
+            return
+
+        self.__cover__(c)
+        covered = True # column 'c' is covered but no row of it is chosen
+        r = down[c]
+        try:
+            while True:
+                if r==c:
+                    # every row of this column has been tried : backtrack
+                    self.__uncover__(c)
+                    covered = False
+                    if not levels:
+                        return
+
+                    c, r = levels.pop()
+                    covered = True
+                    self.__undoRow__(r)
+                    r = down[r]
+                    continue
+
+                if node_check is not None:
+                    node_check()
+
+                self.__doRow__(r)
+                levels.append((c, r))
+                covered = False
+                next_c = self.__chooseColumn__()
+                if next_c==0:
+                    yield [self.row[node] for (column, node) in levels]
+
+                    c, r = levels.pop()
+                    covered = True
+                    self.__undoRow__(r)
+                    r = down[r]
+                    continue
+
+                c = next_c
+                self.__cover__(c)
+                covered = True
+                r = down[c]
+        finally:
+            if covered:
+                self.__uncover__(c)
+
+            while levels:
+                c, r = levels.pop()
+                self.__undoRow__(r)
+                self.__uncover__(c)
+
+    def solve(self, node_check=None):
+        """
+        Return the first exact cover as a list of row indices, or 'None' if there is none.
+        'node_check' is as for 'solutions()'.
+        """
+        for solution in self.solutions(node_check):
+            return solution
+
+        return None
@@ -0,0 +1,217 @@
+#  d o c s t r i n g s
+"""
+Generate sudoku puzzles of a chosen difficulty.
+
+A random full grid is made by filling the boxes on the diagonal (which share no row, column
+or box) with random orders of the values and completing the board by search. Clues are then
+removed in random order, keeping each removal which leaves a unique puzzle no harder than the
+target. The difficulty of a puzzle is the least set of strategies which finishes it:
+
+    easy            singles only
+    medium          and intersections (pointing and claiming), pairs and X-Wings
+    hard            and triples and Swordfish
+    very_hard       and quadruples and Jellyfish
+    very_very_hard  the strategies stall, so a solver must search
+
+A puzzle the strategies finish is unique, as each strategy only removes values which no
+solution can have. Beyond the strategies, removing the clue v at a square leaves a unique
+puzzle exactly when no solution has another value there, which is one short search; with
+'--max-nodes' a search which runs longer keeps the clue, which is always safe. Each process
+reuses one board for all of its trials. Puzzles are written as lines, one per line:
+
+    python generator.py --count 1000 --difficulty hard --seed 42 --jobs 4 > puzzles.txt
+"""
+
+
+#  d e p e n d e n c i e s
+import argparse
+import multiprocessing
+import random
+import sys
+
+from corpus import corpusWriter
+from sudoku import budgetExceeded, board_orders, lineToSquares, squaresToLine
+from workers import poolResults, workerBoard
+
+
+#  v a r i a b l e s
+difficulty_levels = ['easy', 'medium', 'hard', 'very_hard', 'very_very_hard']
+level_subset_sizes = [[], [1, 2], [1, 2, 3], [1, 2, 3, 4]] # strategies allowed at each level but the last
+max_attempts = 100 # full grids tried for one puzzle before settling for an easier one
+
+
+#  f u n c t i o n s
+def randomGrid(rng, board):
+    """
+    Return a random full grid for the board, as given squares {(x, y) : [value]}, drawn with
+    the 'random.Random' instance 'rng'.
+    """
+    width, height = board.box_size
+    given_squares = {}
+    for b in range(min(board.size[0] // width, board.size[1] // height)):
+        values = list(board.values)
+        rng.shuffle(values)
+        for i in range(width):
+            for j in range(height):
+                given_squares[(b * width + i, b * height + j)] = [values.pop()]
+
+    board.reset(given_squares)
+    for line in board.solutions(1):
+        return lineToSquares(line)
+
+def puzzleLevel(board, given_squares):
+    """
+    Return the difficulty of a puzzle as an index into 'difficulty_levels': the first level
+    whose strategies finish it. The puzzle must have a solution.
+    """
+    subset_sizes = board.subset_sizes
+    board.reset(given_squares)
+    try:
+        for level in range(len(level_subset_sizes)):
+            # the strategies only remove values, so each level carries on where the last stalled
+            board.subset_sizes = level_subset_sizes[level]
+            if board.solve():
+                return level
+    finally:
+        board.subset_sizes = subset_sizes
+
+    return len(level_subset_sizes)
+
+def isFinishedAt(board, given_squares, level):
+    """
+    Return 'True' if the strategies of the given level finish the puzzle.
+    """
+    subset_sizes = board.subset_sizes
+    board.reset(given_squares)
+    board.subset_sizes = level_subset_sizes[min(level, len(level_subset_sizes) - 1)]
+    try:
+        return board.solve()
+    finally:
+        board.subset_sizes = subset_sizes
+
+def isUniqueWithout(board, given_squares, location, value, max_nodes=None):
+    """
+    Return 'True' if the puzzle of the given squares, which has a unique solution with 'value'
+    at 'location', still has a unique solution without that clue. If the search passes
+    'max_nodes' nodes, 'False' is returned, so that the clue is kept.
+    """
+    trial = dict(given_squares)
+    trial[location] = [v for v in board.values if v!=value]
+    board.reset(trial)
+    try:
+        return board.countSolutions(1, max_nodes=max_nodes)==0
+    except budgetExceeded:
+        return False
+
+def generatePuzzle(rng, difficulty='medium', order=3, board=None, max_nodes=None):
+    """
+    Return (puzzle, solution, difficulty) for a new puzzle, as lines, drawn with the
+    'random.Random' instance 'rng'. If no grid in 'max_attempts' reaches the difficulty, the
+    hardest puzzle found is returned with its own difficulty. Each uniqueness trial searches
+    no more than 'max_nodes' nodes, if given.
+    """
+    target = difficulty_levels.index(difficulty)
+    if board is None:
+        board = workerBoard(order)
+
+    best = None
+    for attempt in range(max_attempts):
+        solution = randomGrid(rng, board)
+        given_squares = dict(solution)
+        locations = sorted(given_squares.keys())
+        rng.shuffle(locations)
+        for location in locations:
+            # a removal is kept if the target's strategies still finish the puzzle or, beyond
+            # the strategies, if the puzzle stays unique
+            value = given_squares.pop(location)
+            if isFinishedAt(board, given_squares, target):
+                continue
+
+            if target<len(level_subset_sizes) or not isUniqueWithout(board, given_squares, location, value[0], max_nodes):
+                given_squares[location] = value
+
+        level = puzzleLevel(board, given_squares)
+        if best is None or level>best[2]:
+            best = (squaresToLine(given_squares, order), squaresToLine(solution, order), level)
+
+        if level==target:
+            break
+
+    puzzle, solution, level = best
+    return puzzle, solution, difficulty_levels[level]
+
+def puzzleSeed(seed, i):
+    """
+    Return the seed of the i'th puzzle of a run, so that each puzzle depends only on the run
+    seed and its position, whichever process makes it.
+    """
+    return seed * 1000003 + i
+
+def generateChunk(task):
+    """
+    Generate one (seed, start, count, difficulty, order, max nodes) task of puzzles. Return a
+    list of (puzzle, solution, difficulty).
+    """
+    seed, start, count, difficulty, order, max_nodes = task
+    results = []
+    for i in range(start, start + count):
+        rng = random.Random(puzzleSeed(seed, i))
+        results.append(generatePuzzle(rng, difficulty, order, max_nodes=max_nodes))
+
+    return results
+
+def generatePuzzles(count, difficulty='medium', seed=0, order=3, jobs=None, chunksize=4, max_nodes=None):
+    """
+    Yield (puzzle, solution, difficulty) for 'count' new puzzles, in order, made by 'jobs'
+    worker processes (default: one per CPU, or in this process if 1). The same seed gives the
+    same puzzles for any number of jobs. Each uniqueness trial searches no more than
+    'max_nodes' nodes, if given, which counts nodes rather than time to keep runs reproducible.
+    """
+    if difficulty not in difficulty_levels:
+        raise ValueError("unknown difficulty '%s', expected one of %s" % (difficulty, difficulty_levels))
+
+    tasks = [(seed, start, min(chunksize, count - start), difficulty, order, max_nodes) for start in range(0, count, chunksize)]
+    if jobs==1:
+        for task in tasks:
+            for result in generateChunk(task):
+                yield result
+
+        return
+
+    for results in poolResults(multiprocessing.Pool(jobs), generateChunk, tasks):
+        for result in results:
+            yield result
+
+def main(argv=None):
+    """
+    Run the generator from the command line, writing one puzzle line per puzzle.
+    """
+    parser = argparse.ArgumentParser(description="Generate sudoku puzzles of a chosen difficulty.")
+    parser.add_argument('-n', '--count', type=int, default=1, help="number of puzzles to generate")
+    parser.add_argument('-d', '--difficulty', choices=difficulty_levels, default='medium', help="target difficulty (default: medium)")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="seed of the random generator")
+    parser.add_argument('-o', '--order', type=int, choices=board_orders, default=3, help="box size: 3 for 9x9 puzzles, 4 for 16x16")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="number of worker processes (default: one per CPU)")
+    parser.add_argument('-c', '--chunksize', type=int, default=4, help="puzzles generated by a worker at a time")
+    parser.add_argument('--solutions', action='store_true', help="write 'puzzle,solution' lines")
+    parser.add_argument('--max-nodes', type=int, default=None, help="search nodes of a uniqueness trial before its clue is kept (default: no limit)")
+    args = parser.parse_args(argv)
+
+    n_missed = 0
+    results = generatePuzzles(args.count, args.difficulty, args.seed, args.order, args.jobs, args.chunksize, args.max_nodes)
+    with corpusWriter(sys.stdout, buffer_lines=1) as writer:
+        for puzzle, solution, difficulty in results:
+            if difficulty!=args.difficulty:
+                n_missed += 1
+
+            writer.write(puzzle, solution if args.solutions else None)
+
+    if n_missed:
+        sys.stderr.write('%d of %d puzzles are easier than %s\n' % (n_missed, args.count, args.difficulty))
+
+    return 0
+
+
+#  m a i n   e x e c u t i o n
+if __name__ == "__main__":
+    sys.exit(main())
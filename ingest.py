@@ -0,0 +1,412 @@
+#  d o c s t r i n g s
+"""
+Read puzzles from images of clean printed grids, such as 'examples/*.png', using NumPy.
+
+Each PNG file is decoded here (with 'zlib', so no imaging library is needed) to an array of
+grey levels, composited on white. The grid lines are the rows and columns of the image which
+are mostly grey or darker; the squares lie between them, and the ink inside each square, away
+from its borders, is either too little to be a digit or is cut to its bounding box, scaled to
+the size of the glyph templates and matched against them by counting the pixels which differ.
+All the squares of an image are matched against all the templates at once, as one array
+operation.
+
+The templates are the bundled 'glyphs.txt', learnt from the example images and their known
+puzzles, and can be relearnt from any labelled set of images of another typeface:
+
+    python ingest.py examples/*.png --jobs 4 > puzzles.txt
+    python ingest.py examples/*.png --learn glyphs.txt --puzzles answers.txt
+
+The puzzle lines written can be piped straight into 'batch.py'.
+"""
+
+
+#  d e p e n d e n c i e s
+import argparse
+import multiprocessing
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+from corpus import corpusWriter, readCorpus
+from sudoku import board_orders, lineToSquares, squaresToLine
+from workers import poolResults
+
+
+#  v a r i a b l e s
+glyph_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'glyphs.txt')
+glyph_size = (16, 12) # rows and columns of a glyph template
+ink_level = 128 # grey levels below this are the ink of a digit
+line_level = 235 # grey levels below this may be grid lines, which are often printed lighter or thinner
+line_fraction = 0.6 # share of line pixels in a row or column of the image on a grid line
+square_margin = 0.12 # share of a square's width and height left out at each border
+empty_fraction = 0.01 # share of ink below which a square is empty
+png_signature = '\x89PNG\r\n\x1a\n'
+png_channels = {0 : 1, 2 : 3, 3 : 1, 4 : 2, 6 : 4} # samples per pixel of each PNG colour type
+worker_glyphs = None # the glyph templates of this (worker) process, read on first use
+
+
+#  f u n c t i o n s
+def readPNG(data):
+    """
+    Return the image of a non-interlaced PNG file, given as a string of bytes, as an array of
+    grey levels (0 black to 255 white) of shape (height, width). Transparent pixels are shown
+    on white. Raise 'ValueError' if the data is not a PNG image this decoder supports.
+    """
+    if data[:8]!=png_signature:
+        raise ValueError('not a PNG file')
+
+    header = None
+    palette = None
+    transparency = None
+    idat = []
+    i = 8
+    while i + 8<=len(data):
+        length, kind = struct.unpack('>I4s', data[i:i + 8])
+        chunk = data[i + 8:i + 8 + length]
+        i += 12 + length
+        if kind=='IHDR':
+            header = struct.unpack('>IIBBBBB', chunk)
+        elif kind=='PLTE':
+            palette = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, 3)
+        elif kind=='tRNS':
+            transparency = chunk
+        elif kind=='IDAT':
+            idat.append(chunk)
+        elif kind=='IEND':
+            break
+
+    if header is None or not idat:
+        raise ValueError('PNG file has no image data')
+
+    width, height, depth, colour, compression, filtering, interlace = header
+    if interlace or colour not in png_channels or (depth<8 and colour not in [0, 3]):
+        raise ValueError('unsupported PNG format: colour type %d, depth %d, interlace %d' % (colour, depth, interlace))
+
+    channels = png_channels[colour]
+    pixel_bytes = max(1, channels * depth // 8)
+    row_bytes = (width * channels * depth + 7) // 8
+    rows = unfilter(zlib.decompress(''.join(idat)), height, row_bytes, pixel_bytes)
+
+    # samples per pixel, scaled to 8 bits
+    if depth==16:
+        samples = rows.reshape(height, width, channels, 2)[:, :, :, 0]
+    elif depth==8:
+        samples = rows.reshape(height, width, channels)
+    else:
+        bits = np.unpackbits(rows, axis=1)[:, :width * depth].reshape(height, width, depth)
+        samples = (bits * (1 << np.arange(depth - 1, -1, -1))).sum(axis=2).reshape(height, width, 1)
+
+    if colour==3:
+        if palette is None:
+            raise ValueError('PNG file has no palette')
+
+        alpha = np.full(256, 255, dtype=np.float32)
+        if transparency is not None:
+            alpha[:len(transparency)] = np.frombuffer(transparency, dtype=np.uint8)
+
+        grey = np.zeros(256, dtype=np.float32)
+        grey[:len(palette)] = palette.dot([0.299, 0.587, 0.114])
+        lookup = (grey * alpha + 255.0 * (255.0 - alpha)) / 255.0
+        return lookup[samples[:, :, 0]].astype(np.uint8)
+
+    samples = samples.astype(np.float32)
+    if depth<8:
+        samples *= 255.0 / ((1 << depth) - 1)
+
+    if colour in [2, 6]:
+        grey = samples[:, :, :3].dot([0.299, 0.587, 0.114])
+    else:
+        grey = samples[:, :, 0]
+
+    if colour in [4, 6]:
+        alpha = samples[:, :, -1]
+        grey = (grey * alpha + 255.0 * (255.0 - alpha)) / 255.0
+
+    return grey.astype(np.uint8)
+
+def unfilter(raw, height, row_bytes, pixel_bytes):
+    """
+    Return the rows of PNG image data with their filters undone, as an array of bytes of shape
+    (height, row_bytes). The 'None', 'Sub' and 'Up' filters are undone a row at a time as array
+    operations; an image with 'Average' or 'Paeth' rows is undone by 'unfilterDiagonals()'.
+    """
+    data = np.frombuffer(raw, dtype=np.uint8)[:height * (row_bytes + 1)].reshape(height, row_bytes + 1)
+    filters = data[:, 0]
+    unknown = filters[filters>4]
+    if len(unknown):
+        raise ValueError('unknown PNG filter %d' % unknown[0])
+
+    rows = data[:, 1:].astype(np.int32)
+    if (filters>=3).any():
+        return unfilterDiagonals(rows, filters, pixel_bytes)
+
+    previous = np.zeros(row_bytes, dtype=np.int32)
+    for j in range(height):
+        row = rows[j]
+        kind = filters[j]
+        if kind==1:
+            padded = np.zeros(((row_bytes + pixel_bytes - 1) // pixel_bytes) * pixel_bytes, dtype=np.int32)
+            padded[:row_bytes] = row
+            row = np.cumsum(padded.reshape(-1, pixel_bytes), axis=0).reshape(-1)[:row_bytes] & 0xff
+        elif kind==2:
+            row = (row + previous) & 0xff
+
+        rows[j] = row
+        previous = row
+
+    return rows.astype(np.uint8)
+
+def unfilterDiagonals(rows, filters, pixel_bytes):
+    """
+    Return filtered rows of PNG image data, as an array of shape (height, row_bytes), undone a
+    diagonal of pixels at a time: every filter predicts a pixel from those to its left, above
+    and above left, which lie on earlier diagonals, so each diagonal is one array operation
+    across rows of any filters.
+    """
+    height, row_bytes = rows.shape
+    width = (row_bytes + pixel_bytes - 1) // pixel_bytes
+    padded = np.zeros((height, width * pixel_bytes), dtype=np.int32)
+    padded[:, :row_bytes] = rows
+    # the pixels, after a row and a column of zeros for the edges
+    pixels = np.zeros((height + 1, width + 1, pixel_bytes), dtype=np.int32)
+    pixels[1:, 1:] = padded.reshape(height, width, pixel_bytes)
+    kinds = filters.astype(np.int32)[:, None]
+    for d in range(height + width - 1):
+        y = np.arange(max(0, d - width + 1), min(height, d + 1))
+        x = d - y + 1
+        left = pixels[y + 1, x - 1]
+        up = pixels[y, x]
+        upper_left = pixels[y, x - 1]
+        # Paeth: whichever of the three is nearest to left + up - upper_left
+        left_distance = np.abs(up - upper_left)
+        up_distance = np.abs(left - upper_left)
+        upper_left_distance = np.abs(left + up - 2 * upper_left)
+        paeth = np.where((left_distance<=up_distance) & (left_distance<=upper_left_distance), left,
+                         np.where(up_distance<=upper_left_distance, up, upper_left))
+        predictions = np.choose(kinds[y], [0, left, up, (left + up) // 2, paeth])
+        pixels[y + 1, x] = (pixels[y + 1, x] + predictions) & 0xff
+
+    return pixels[1:, 1:].reshape(height, -1)[:, :row_bytes].astype(np.uint8)
+
+def gridLines(profile):
+    """
+    Return the (first, last) index of each run of grid lines in a profile of the share of line
+    pixels along one axis of the image.
+    """
+    on_line = np.concatenate([[False], profile>line_fraction, [False]])
+    edges = np.flatnonzero(on_line[1:]!=on_line[:-1])
+    return [(edges[i], edges[i + 1] - 1) for i in range(0, len(edges), 2)]
+
+def squareGlyphs(grey):
+    """
+    Find the grid of an image of grey levels. Return (order, glyphs, locations): the order of
+    the board, the ink of each square with a digit scaled to a 0/1 array of 'glyph_size', as
+    one array of shape (squares, rows * columns), and the (x, y) location of each.
+    """
+    lines = grey<line_level
+    columns = gridLines(lines.mean(axis=0))
+    rows = gridLines(lines.mean(axis=1))
+    n = len(columns) - 1
+    if n!=len(rows) - 1 or n not in [order * order for order in board_orders]:
+        raise ValueError('found %d x %d grid lines, expected a square board' % (len(columns), len(rows)))
+
+    glyphs = []
+    locations = []
+    for y in range(n):
+        top, bottom = rows[y][1] + 1, rows[y + 1][0]
+        margin_y = int(round((bottom - top) * square_margin))
+        for x in range(n):
+            left, right = columns[x][1] + 1, columns[x + 1][0]
+            margin_x = int(round((right - left) * square_margin))
+            square = grey[top + margin_y:bottom - margin_y, left + margin_x:right - margin_x]<ink_level
+            if square.size==0 or square.mean()<empty_fraction:
+                continue
+
+            glyphs.append(scaleGlyph(square))
+            locations.append((x, y))
+
+    glyphs = np.array(glyphs, dtype=np.uint8).reshape(len(glyphs), glyph_size[0] * glyph_size[1])
+    return int(round(n ** 0.5)), glyphs, locations
+
+def scaleGlyph(square):
+    """
+    Return the ink of a square cut to its bounding box, padded about its centre to the shape of
+    a glyph template and sampled to 'glyph_size', as a 0/1 array.
+    """
+    ink_rows = np.flatnonzero(square.any(axis=1))
+    ink_columns = np.flatnonzero(square.any(axis=0))
+    top, bottom = ink_rows[0], ink_rows[-1] + 1
+    left, right = ink_columns[0], ink_columns[-1] + 1
+    height = float(bottom - top)
+    width = float(right - left)
+    if width * glyph_size[0]<height * glyph_size[1]:
+        width = height * glyph_size[1] / glyph_size[0]
+    else:
+        height = width * glyph_size[0] / glyph_size[1]
+
+    centre_y = (top + bottom) / 2.0
+    centre_x = (left + right) / 2.0
+    ys = np.floor(centre_y - height / 2.0 + (np.arange(glyph_size[0]) + 0.5) * height / glyph_size[0]).astype(int)
+    xs = np.floor(centre_x - width / 2.0 + (np.arange(glyph_size[1]) + 0.5) * width / glyph_size[1]).astype(int)
+    inside = ((ys>=0) & (ys<square.shape[0]))[:, None] & ((xs>=0) & (xs<square.shape[1]))[None, :]
+    sampled = square[np.clip(ys, 0, square.shape[0] - 1)][:, np.clip(xs, 0, square.shape[1] - 1)]
+    return sampled & inside
+
+def readGlyphs(path=glyph_path):
+    """
+    Return the glyph templates of a file as (values, templates): the value of each template and
+    the templates as one 0/1 array of shape (templates, rows * columns). Each template is a line
+    holding its value followed by 'glyph_size' rows of '#' (ink) and '.'.
+    """
+    values = []
+    templates = []
+    with open(path) as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    for i in range(0, len(lines), glyph_size[0] + 1):
+        values.append(int(lines[i]))
+        rows = lines[i + 1:i + 1 + glyph_size[0]]
+        templates.append([c=='#' for row in rows for c in row])
+
+    return values, np.array(templates, dtype=np.uint8)
+
+def writeGlyphs(values, templates, path=glyph_path):
+    """
+    Write glyph templates to a file, as read by 'readGlyphs'.
+    """
+    with open(path, 'w') as f:
+        for v, template in zip(values, templates):
+            f.write('%d\n' % v)
+            for row in template.reshape(glyph_size):
+                f.write(''.join('#' if bit else '.' for bit in row) + '\n')
+
+def matchGlyphs(glyphs, values, templates):
+    """
+    Return the value of the nearest template to each glyph, by the number of differing pixels.
+    """
+    if not len(glyphs):
+        return []
+
+    distances = (glyphs[:, None, :]!=templates[None, :, :]).sum(axis=2)
+    return [values[i] for i in distances.argmin(axis=1)]
+
+def imageToSquares(data, glyphs=None):
+    """
+    Return (order, given_squares) for the image of a puzzle, given as the bytes of a PNG file,
+    with the given squares as {(x, y) : [value]}. 'glyphs' are the (values, templates) to
+    match, by default those of 'glyphs.txt'.
+    """
+    if glyphs is None:
+        glyphs = workerGlyphs()
+
+    values, templates = glyphs
+    order, square_glyphs, locations = squareGlyphs(readPNG(data))
+    given_squares = {}
+    for location, v in zip(locations, matchGlyphs(square_glyphs, values, templates)):
+        given_squares[location] = [v]
+
+    return order, given_squares
+
+def workerGlyphs():
+    """
+    Return the glyph templates of this process, reading them on first use.
+    """
+    global worker_glyphs
+    if worker_glyphs is None:
+        worker_glyphs = readGlyphs()
+
+    return worker_glyphs
+
+def ingestFile(path):
+    """
+    Read the puzzle of one image file. Return (path, puzzle line, error), with an empty line and
+    the error message if the image could not be read.
+    """
+    try:
+        with open(path, 'rb') as f:
+            order, given_squares = imageToSquares(f.read())
+    except (IOError, ValueError, zlib.error), e:
+        return path, '', str(e)
+
+    return path, squaresToLine(given_squares, order), None
+
+def ingestFiles(paths, jobs=None, chunksize=16):
+    """
+    Yield (path, puzzle line, error) for each image file, in order, read by 'jobs' worker
+    processes (default: one per CPU, or in this process if 1).
+    """
+    if jobs==1:
+        for path in paths:
+            yield ingestFile(path)
+
+        return
+
+    for result in poolResults(multiprocessing.Pool(jobs), ingestFile, paths, chunksize):
+        yield result
+
+def learnGlyphs(paths, puzzles):
+    """
+    Return glyph templates (values, templates) learnt from images of known puzzles: for each
+    value, the pixels inked in at least half of its glyphs in the images.
+    """
+    sums = {}
+    counts = {}
+    for path, puzzle in zip(paths, puzzles):
+        with open(path, 'rb') as f:
+            order, square_glyphs, locations = squareGlyphs(readPNG(f.read()))
+
+        given_squares = lineToSquares(puzzle)
+        for glyph, location in zip(square_glyphs, locations):
+            if location not in given_squares:
+                raise ValueError("%s has a digit at %s which its puzzle does not" % (path, location))
+
+            v = given_squares[location][0]
+            sums[v] = sums.get(v, 0) + glyph.astype(np.int32)
+            counts[v] = counts.get(v, 0) + 1
+
+    values = sorted(sums.keys())
+    templates = np.array([sums[v] * 2>=counts[v] for v in values], dtype=np.uint8)
+    return values, templates
+
+def main(argv=None):
+    """
+    Read the puzzles of image files from the command line, writing one puzzle line per image,
+    or learn glyph templates from images of known puzzles. Return 1 if an image could not be
+    read.
+    """
+    parser = argparse.ArgumentParser(description="Read sudoku puzzles from images of printed grids.")
+    parser.add_argument('images', nargs='+', help="PNG images of puzzles")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="number of worker processes (default: one per CPU)")
+    parser.add_argument('-c', '--chunksize', type=int, default=16, help="images sent to a worker at a time")
+    parser.add_argument('--learn', help="write glyph templates learnt from the images to this file")
+    parser.add_argument('--puzzles', help="with --learn, a file of the puzzle lines of the images, in order")
+    args = parser.parse_args(argv)
+
+    if args.learn:
+        if not args.puzzles:
+            parser.error('--learn needs --puzzles')
+
+        puzzles = [puzzle for puzzle, solution in readCorpus(args.puzzles)]
+        values, templates = learnGlyphs(args.images, puzzles)
+        writeGlyphs(values, templates, args.learn)
+        return 0
+
+    n_failed = 0
+    with corpusWriter(sys.stdout) as writer:
+        for path, puzzle, error in ingestFiles(args.images, args.jobs, args.chunksize):
+            if error is not None:
+                sys.stderr.write("%s: %s\n" % (path, error))
+                n_failed += 1
+                continue
+
+            writer.write(puzzle)
+
+    return 1 if n_failed else 0
+
+
+#  m a i n   e x e c u t i o n
+if __name__ == "__main__":
+    sys.exit(main())
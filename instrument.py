@@ -0,0 +1,156 @@
+#  d o c s t r i n g s
+"""
+Instrumentation of a solve: per-strategy statistics, a trace of every change of possible
+values, and a cProfile export.
+
+    python instrument.py <puzzle line> --trace trace.txt --profile solve.prof
+"""
+
+
+#  d e p e n d e n c i e s
+import argparse
+import cProfile
+import pstats
+import sys
+
+from sudoku import sudokuBoard, solveObserver, lineOrder, lineToSquares, maskToValues, solve_engines
+
+
+#  c l a s s e s
+class statisticsObserver(solveObserver):
+    """
+    Collect the calls, values eliminated and wall time of each strategy, and the passes and
+    time of each solve.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self):
+        self.calls = {}
+        self.eliminated = {}
+        self.seconds = {}
+        self.solves = 0
+        self.solved = 0
+        self.passes = 0
+        self.solve_seconds = 0.0
+
+    #  p u b l i c   m e t h o d s
+    def strategy(self, name, seconds, eliminated):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.eliminated[name] = self.eliminated.get(name, 0) + eliminated
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def finished(self, engine, solved, passes, seconds):
+        self.solves += 1
+        self.solved += solved
+        self.passes += passes
+        self.solve_seconds += seconds
+
+    def report(self):
+        """
+        Return the statistics as a text table, most expensive strategy first.
+        """
+        lines = ['%-24s %8s %10s %12s' % ('strategy', 'calls', 'eliminated', 'seconds')]
+        for name in sorted(self.seconds.keys(), key=lambda name: -self.seconds[name]):
+            lines.append('%-24s %8d %10d %12.6f' % (name, self.calls[name], self.eliminated[name], self.seconds[name]))
+
+        lines.append('%d of %d solved in %d passes, %.6f seconds' % (self.solved, self.solves, self.passes, self.solve_seconds))
+        return '\n'.join(lines)
+
+
+class traceObserver(solveObserver):
+    """
+    Write each change of possible values, and each strategy run, to a stream.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+
+    #  p u b l i c   m e t h o d s
+    def strategy(self, name, seconds, eliminated):
+        self.stream.write('%s\t%d eliminated in %.6f seconds\n' % (name, eliminated, seconds))
+
+    def change(self, square, old_mask, new_mask, strategy):
+        self.stream.write('%s\t%s : %s --> %s\n' % (strategy, square.location(), maskToValues(old_mask), maskToValues(new_mask)))
+
+    def finished(self, engine, solved, passes, seconds):
+        self.stream.write('%s\t%s after %d passes in %.6f seconds\n' % (engine, 'solved' if solved else 'failed', passes, seconds))
+
+
+class multiObserver(solveObserver):
+    """
+    Pass every event on to each of a list of observers.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self, observers):
+        self.observers = observers
+
+    #  p u b l i c   m e t h o d s
+    def strategy(self, name, seconds, eliminated):
+        for observer in self.observers:
+            observer.strategy(name, seconds, eliminated)
+
+    def change(self, square, old_mask, new_mask, strategy):
+        for observer in self.observers:
+            observer.change(square, old_mask, new_mask, strategy)
+
+    def finished(self, engine, solved, passes, seconds):
+        for observer in self.observers:
+            observer.finished(engine, solved, passes, seconds)
+
+
+#  f u n c t i o n s
+def profileSolve(given_squares, path=None, engine='dlx', observer=None, order=3):
+    """
+    Construct and solve a board of the given order under cProfile. Return the 'pstats.Stats'
+    of the solve, after writing them to 'path' if given (readable with 'python -m pstats').
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        board = sudokuBoard(given_squares, observer=observer, order=order)
+        board.solve(engine=engine)
+    finally:
+        profile.disable()
+
+    if path is not None:
+        profile.dump_stats(path)
+
+    return pstats.Stats(profile)
+
+def main(argv=None):
+    """
+    Solve one puzzle line with statistics, and optionally a trace and a profile.
+    """
+    parser = argparse.ArgumentParser(description="Instrument the solve of one sudoku puzzle.")
+    parser.add_argument('puzzle', help="the puzzle as a line of 81 (or 256 or 625) characters")
+    parser.add_argument('-e', '--engine', choices=solve_engines, default='dlx', help="solve engine (default: dlx)")
+    parser.add_argument('--trace', help="write every change of possible values to this file")
+    parser.add_argument('--profile', help="write the cProfile statistics of the solve to this file")
+    args = parser.parse_args(argv)
+
+    statistics = statisticsObserver()
+    observers = [statistics]
+    trace_file = None
+    if args.trace:
+        trace_file = open(args.trace, 'w')
+        observers.append(traceObserver(trace_file))
+
+    try:
+        given_squares = lineToSquares(args.puzzle)
+        order = lineOrder(args.puzzle)
+        if args.profile:
+            stats = profileSolve(given_squares, args.profile, args.engine, multiObserver(observers), order)
+            stats.sort_stats('cumulative').print_stats(15)
+        else:
+            board = sudokuBoard(given_squares, observer=multiObserver(observers), order=order)
+            board.solve(engine=args.engine)
+    finally:
+        if trace_file is not None:
+            trace_file.close()
+
+    print statistics.report()
+    return 0
+
+
+#  m a i n   e x e c u t i o n
+if __name__ == "__main__":
+    sys.exit(main())
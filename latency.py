@@ -0,0 +1,20 @@
+#  d o c s t r i n g s
+"""
+Latency statistics shared by the benchmark harness and the solve service.
+"""
+
+
+#  v a r i a b l e s
+latency_percentiles = [50, 90, 99]
+
+
+#  f u n c t i o n s
+def percentile(sorted_values, q):
+    """
+    Return the q'th percentile of a sorted list, by the nearest rank.
+    """
+    if not sorted_values:
+        return 0.0
+
+    rank = int(round(q / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[rank]
@@ -0,0 +1,222 @@
+#  d o c s t r i n g s
+"""
+Parallel search within one puzzle.
+
+The board is propagated until the logical strategies stall, and the search tree below it is
+split breadth first, branching on the unknown square with the fewest possible values (see
+'sudokuBoard.branches()'), until there are several subproblems for each worker process. The
+subproblems are handed out one at a time, so a worker which finishes an easy subtree takes
+the next one while others are still busy, and each is searched depth first from its packed
+state (see 'sudokuBoard.state()'). As soon as enough solutions are found, one to solve or two
+to disprove uniqueness, the search is cancelled: workers skip the subproblems not yet started.
+
+    python parallel.py <puzzle line> --jobs 8
+    python parallel.py <puzzle line> --jobs 8 --unique
+
+A search may be limited as 'sudokuBoard.solutions()' is: the deadline bounds the whole search,
+while the most nodes and passes bound the search of each subproblem and each branching of the
+split. When a limit is passed the search is cancelled and 'budgetExceeded' raised.
+"""
+
+
+#  d e p e n d e n c i e s
+import argparse
+import multiprocessing
+import sys
+import time
+from collections import deque
+
+from sudoku import sudokuBoard, budgetExceeded, lineOrder, lineToSquares, layout_names, namedLayout
+from workers import workerBoard
+
+
+#  v a r i a b l e s
+tasks_per_job = 8 # subproblems split off for each worker, so that idle workers find more work
+search_id = None # shared id of the running search, set by initWorker(); a task of any other is skipped
+search_layout = None # layout of the boards searched by this (worker) process, set by initWorker()
+
+
+#  f u n c t i o n s
+def initWorker(shared_id, layout):
+    """
+    Keep the shared id of the running search and the layout of its boards in a worker process.
+    """
+    global search_id, search_layout
+    search_id = shared_id
+    search_layout = layout
+
+def searchPool(jobs=None, layout=None):
+    """
+    Return a pool of 'jobs' worker processes (default: one per CPU) for 'parallelSolutions()',
+    which can be reused by many searches of boards of a layout (default: standard), one at a
+    time. The layout is passed to the workers once, rather than with each subproblem.
+    """
+    if layout is None:
+        layout = namedLayout()
+
+    shared_id = multiprocessing.Value('i', 0)
+    pool = multiprocessing.Pool(jobs, initWorker, (shared_id, layout))
+    pool.search_id = shared_id
+    pool.layout = layout
+    pool.jobs = jobs or multiprocessing.cpu_count()
+    return pool
+
+def searchTask(task):
+    """
+    Search one (search id, subset sizes, packed state, limit, deadline, max nodes, max passes)
+    subproblem, on a board of the layout of the pool. Return (solutions, exceeded): a list of
+    up to 'limit' solution lines and the limit passed, if any, as 'budgetExceeded.limit'; or
+    'None' if the search has been cancelled.
+    """
+    task_id, subset_sizes, state, limit, deadline, max_nodes, max_passes = task
+    if search_id is not None and search_id.value!=task_id:
+        return None
+
+    board = workerBoard(layout=search_layout)
+    board.subset_sizes = subset_sizes
+    board.loadState(state)
+    solutions = []
+    try:
+        for line in board.solutions(limit, deadline, max_nodes, max_passes):
+            solutions.append(line)
+    except budgetExceeded, e:
+        return solutions, e.limit
+
+    return solutions, None
+
+def splitBoard(board, n_tasks, deadline=None, max_nodes=None, max_passes=None):
+    """
+    Split the search of a board into about 'n_tasks' subproblems, breadth first. Return
+    (states, solutions): the packed states of the subproblems, and the solution lines reached
+    while splitting. The board is left holding the last state split. Each branching may be
+    limited as 'sudokuBoard.branches()' is, raising 'budgetExceeded'.
+    """
+    frontier = deque([board.state()])
+    solutions = []
+    while frontier and len(frontier)<n_tasks:
+        board.loadState(frontier.popleft())
+        branches = board.branches(deadline, max_nodes, max_passes)
+        if not branches and board.n_known==board.n_squares:
+            solutions.append(board.line())
+
+        frontier.extend(branches)
+
+    return list(frontier), solutions
+
+def parallelSolutions(board, limit=1, jobs=None, pool=None, deadline=None, max_nodes=None, max_passes=None):
+    """
+    Return a list of up to 'limit' solution lines of a board, searched in parallel from where
+    its logical strategies stall by 'jobs' worker processes (default: one per CPU), or by a
+    pool from 'searchPool()' for its layout. The board itself is not changed. The search may
+    be limited by a 'deadline' and by the most nodes and passes of each subproblem, raising
+    'budgetExceeded'.
+    """
+    search_board = sudokuBoard({}, layout=board.layout)
+    search_board.subset_sizes = board.subset_sizes
+    search_board.loadState(board.state())
+    if search_board.solve(deadline=deadline, max_passes=max_passes):
+        return [search_board.line()]
+
+    if search_board.status=='timeout':
+        raise budgetExceeded('deadline')
+    elif search_board.status=='budget':
+        raise budgetExceeded('passes')
+
+    own_pool = pool is None
+    if own_pool:
+        pool = searchPool(jobs, board.layout)
+    elif pool.layout.key!=board.layout.key:
+        raise ValueError("the pool searches boards of another layout")
+
+    try:
+        states, solutions = splitBoard(search_board, pool.jobs * tasks_per_job, deadline, max_nodes, max_passes)
+        if len(solutions)<limit and states:
+            task_id = pool.search_id.value
+            tasks = [(task_id, board.subset_sizes, state, limit, deadline, max_nodes, max_passes) for state in states]
+            results = pool.imap_unordered(searchTask, tasks)
+            exceeded = None # a limit passed by a subproblem, which leaves the search incomplete
+            while len(solutions)<limit:
+                try:
+                    result = results.next(max(0.0, deadline - time.time()) if deadline is not None else None)
+                except StopIteration:
+                    break
+                except multiprocessing.TimeoutError:
+                    raise budgetExceeded('deadline')
+
+                if result is not None:
+                    solutions.extend(result[0])
+                    exceeded = result[1] or exceeded
+
+            if exceeded is not None and len(solutions)<limit:
+                raise budgetExceeded(exceeded)
+    finally:
+        # cancel the subproblems not yet started
+        pool.search_id.value += 1
+        if own_pool:
+            pool.terminate()
+            pool.join()
+
+    return solutions[:limit]
+
+def parallelSolve(board, jobs=None, pool=None, deadline=None, max_nodes=None, max_passes=None):
+    """
+    Solve a board in place, searching in parallel if the logical strategies stall. Return
+    'True' if solved. The search may be limited as 'parallelSolutions()' is.
+    """
+    solutions = parallelSolutions(board, 1, jobs, pool, deadline, max_nodes, max_passes)
+    if solutions:
+        board.reset(lineToSquares(solutions[0]))
+
+    return board.n_known==board.n_squares
+
+def parallelIsUnique(board, jobs=None, pool=None, deadline=None, max_nodes=None, max_passes=None):
+    """
+    Return 'True' if the board has exactly one solution, cancelling the search at a second.
+    The search may be limited as 'parallelSolutions()' is.
+    """
+    return len(parallelSolutions(board, 2, jobs, pool, deadline, max_nodes, max_passes))==1
+
+def main(argv=None):
+    """
+    Solve one puzzle line with a parallel search, or check that it has a unique solution.
+    """
+    parser = argparse.ArgumentParser(description="Search one sudoku puzzle in parallel.")
+    parser.add_argument('puzzle', help="the puzzle as a line of 81 (or 256 or 625) characters")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="number of worker processes (default: one per CPU)")
+    parser.add_argument('-u', '--unique', action='store_true', help="check that the puzzle has exactly one solution")
+    parser.add_argument('-l', '--layout', choices=layout_names, default='standard', help="extra zones of variant puzzles (default: standard)")
+    parser.add_argument('-r', '--regions', help="jigsaw regions, a line with the same character for each square of a region")
+    parser.add_argument('-t', '--timeout', type=float, default=None, help="seconds allowed for the search (default: no limit)")
+    args = parser.parse_args(argv)
+
+    try:
+        layout = namedLayout(args.layout, lineOrder(args.puzzle), args.regions)
+        if layout.order!=lineOrder(args.puzzle):
+            raise ValueError('puzzle and regions of different sizes')
+    except ValueError, e:
+        parser.error(str(e))
+
+    board = sudokuBoard(lineToSquares(args.puzzle), layout=layout)
+    start = time.time()
+    deadline = start + args.timeout if args.timeout is not None else None
+    try:
+        solutions = parallelSolutions(board, 2 if args.unique else 1, args.jobs, deadline=deadline)
+    except budgetExceeded:
+        sys.stderr.write('timeout after %.6f seconds\n' % (time.time() - start))
+        return 1
+
+    seconds = time.time() - start
+    for solution in solutions:
+        print solution
+
+    if args.unique:
+        sys.stderr.write('%s in %.6f seconds\n' % ('unique' if len(solutions)==1 else 'not unique', seconds))
+        return 0 if len(solutions)==1 else 1
+
+    sys.stderr.write('%s in %.6f seconds\n' % ('solved' if solutions else 'no solution', seconds))
+    return 0 if solutions else 1
+
+
+#  m a i n   e x e c u t i o n
+if __name__ == "__main__":
+    sys.exit(main())
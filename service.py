@@ -0,0 +1,365 @@
+#  d o c s t r i n g s
+"""
+A long-running local solve service.
+
+Puzzles are accepted over a local TCP or Unix socket, one JSON request per line, and answered
+with one JSON response per line in the same order:
+
+    {"id": 1, "puzzle": "53..7....6..195....", "engine": "dlx", "timeout": 2.0}
+    {"id": 1, "status": "solved", "solution": "534678912672195348...", "seconds": 0.004}
+
+The status is one of 'solved', 'unsolved', 'invalid' (the puzzle line or the timeout could not
+be read), 'timeout', 'busy' or 'error'. The request {"command": "stats"} returns the counters
+of the service instead. A minimal HTTP endpoint takes the same request as the body of a POST
+to '/solve', and serves the counters at GET '/stats'.
+
+Solves run in a bounded pool of worker processes, each of which keeps one board of each order
+and resets it for every puzzle, so a request pays neither interpreter startup nor the building
+of the board indexes. At most 'max_pending' solves are queued or running at once; beyond that,
+requests are answered 'busy' at once rather than queued without bound. A request which is not
+answered within its timeout, which is at most that of the service, is answered 'timeout', and
+its solve is abandoned at the same deadline (see 'sudokuBoard.solve()'), so no puzzle holds a
+worker for longer.
+
+    python service.py --port 8765 --http 8080 --jobs 4
+    python service.py --unix /tmp/sudoku.sock
+"""
+
+
+#  d e p e n d e n c i e s
+import argparse
+import BaseHTTPServer
+import json
+import multiprocessing
+import os
+import signal
+import SocketServer
+import sys
+import threading
+import time
+from collections import deque
+
+from latency import latency_percentiles, percentile
+from sudoku import lineOrder, lineToSquares, solve_engines
+from workers import workerBoard
+
+
+#  v a r i a b l e s
+default_timeout = 10.0 # seconds a request waits for its solve
+latency_window = 1000 # recent latencies kept for the percentiles
+request_statuses = ['solved', 'unsolved', 'invalid', 'timeout', 'busy', 'error']
+request_results = {'solved' : 'solved', 'stalled' : 'unsolved', 'unsolvable' : 'unsolved', 'timeout' : 'timeout', 'budget' : 'timeout'} # by board status
+
+
+#  c l a s s e s
+class serviceCounters():
+    """
+    Counters of a service: requests by status, solves queued or running, and the latency of
+    recent requests. Safe to share between the threads of the servers.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.statuses = dict((status, 0) for status in request_statuses)
+        self.pending = 0
+        self.latencies = deque(maxlen=latency_window)
+
+    #  p u b l i c   m e t h o d s
+    def count(self, status, seconds):
+        """
+        Count a request answered with 'status' after 'seconds'.
+        """
+        with self.lock:
+            self.requests += 1
+            self.statuses[status] += 1
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        """
+        Return the counters as a dictionary: requests and statuses since the start, requests
+        per second, solves queued or running, and latency percentiles of recent requests.
+        """
+        with self.lock:
+            uptime = time.time() - self.started
+            latencies = sorted(self.latencies)
+            stats = {'uptime' : uptime,
+                     'requests' : self.requests,
+                     'requests_per_second' : self.requests / uptime if uptime else 0.0,
+                     'pending' : self.pending}
+            stats.update(self.statuses)
+
+        for q in latency_percentiles:
+            stats['latency_p%d' % q] = percentile(latencies, q)
+
+        stats['latency_max'] = latencies[-1] if latencies else 0.0
+        return stats
+
+
+class solveService():
+    """
+    A pool of warm worker processes behind a bounded queue, shared by the socket and HTTP
+    servers.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self, jobs=None, max_pending=None, timeout=default_timeout, engine='dlx'):
+        """
+        The initialisation method. 'jobs' worker processes are started (default: one per CPU),
+        and up to 'max_pending' solves (default: four per worker) are queued or running at once.
+        """
+        self.jobs = jobs or multiprocessing.cpu_count()
+        self.pool = multiprocessing.Pool(self.jobs, initWorker)
+        self.max_pending = max_pending or 4 * self.jobs
+        self.timeout = timeout
+        self.engine = engine
+        self.counters = serviceCounters()
+
+    def __finished__(self, result):
+        """
+        Free the place of a completed solve, whether or not its request is still waiting.
+        """
+        with self.counters.lock:
+            self.counters.pending -= 1
+
+    #  p u b l i c   m e t h o d s
+    def handle(self, request):
+        """
+        Return the response to a request dictionary. A request's timeout must be a positive
+        number of seconds, and is cut to the timeout of the service.
+        """
+        start = time.time()
+        response = {}
+        if 'id' in request:
+            response['id'] = request['id']
+
+        if request.get('command')=='stats':
+            response.update(self.counters.snapshot())
+            return response
+
+        puzzle = request.get('puzzle')
+        engine = request.get('engine', self.engine)
+        timeout = request.get('timeout', self.timeout)
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, long, float)) or not 0<timeout<float('inf'):
+            status = 'invalid'
+        elif not isinstance(puzzle, basestring) or engine not in solve_engines:
+            status = 'invalid'
+        else:
+            status = self.solve(puzzle.strip().encode('ascii', 'replace'), engine, min(timeout, self.timeout), response)
+
+        response['status'] = status
+        response['seconds'] = time.time() - start
+        self.counters.count(status, response['seconds'])
+        return response
+
+    def solve(self, puzzle, engine, timeout, response):
+        """
+        Queue a puzzle for the pool unless 'max_pending' solves are already queued or running,
+        and wait up to 'timeout' seconds for it. Return the status, setting the solution in the
+        response.
+        """
+        deadline = time.time() + timeout
+        with self.counters.lock:
+            if self.counters.pending>=self.max_pending:
+                return 'busy'
+
+            self.counters.pending += 1
+
+        try:
+            result = self.pool.apply_async(solveRequest, [(puzzle, engine, deadline)], callback=self.__finished__)
+        except Exception:
+            self.__finished__(None)
+            raise
+
+        try:
+            status, solution, seconds = result.get(max(0.0, deadline - time.time()))
+        except multiprocessing.TimeoutError:
+            return 'timeout'
+
+        if status=='error':
+            response['error'] = solution
+        elif solution:
+            response['solution'] = solution
+
+        return status
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        self.pool.terminate()
+        self.pool.join()
+
+
+class jsonLinesHandler(SocketServer.StreamRequestHandler):
+    """
+    Answer each JSON line of a connection in turn, until it closes.
+    """
+    def handle(self):
+        for line in iter(self.rfile.readline, ''):
+            if not line.strip():
+                continue
+
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('a request must be an object')
+            except ValueError, e:
+                response = {'status' : 'invalid', 'error' : str(e)}
+                self.server.service.counters.count('invalid', 0.0)
+            else:
+                response = self.server.service.handle(request)
+
+            self.wfile.write(json.dumps(response) + '\n')
+            self.wfile.flush()
+
+
+class httpHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Answer POST '/solve' with a JSON request as the body, and GET '/stats'.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __reply__(self, code, response):
+        body = json.dumps(response)
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    #  p u b l i c   m e t h o d s
+    def do_GET(self):
+        if self.path=='/stats':
+            self.__reply__(200, self.server.service.counters.snapshot())
+        else:
+            self.__reply__(404, {'error' : 'not found'})
+
+    def do_POST(self):
+        if self.path!='/solve':
+            self.__reply__(404, {'error' : 'not found'})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if not isinstance(request, dict):
+                raise ValueError('a request must be an object')
+        except ValueError, e:
+            self.__reply__(400, {'status' : 'invalid', 'error' : str(e)})
+            return
+
+        response = self.server.service.handle(request)
+        self.__reply__(503 if response['status']=='busy' else 200, response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class tcpServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class unixServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+
+class httpServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+#  f u n c t i o n s
+def initWorker(orders=[3]):
+    """
+    Build the boards of a worker process for the given orders, so the first request of each is
+    as fast as the rest. An interrupt is left to the service to handle.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for order in orders:
+        workerBoard(order)
+
+def solveRequest(task):
+    """
+    Solve one (puzzle, engine, deadline) task on the board of this process. Return (status,
+    solution, seconds); exceptions are returned as status 'error', so that every task completes.
+    """
+    puzzle, engine, deadline = task
+    start = time.time()
+    try:
+        try:
+            order = lineOrder(puzzle)
+            given_squares = lineToSquares(puzzle)
+        except ValueError:
+            return 'invalid', '', time.time() - start
+
+        board = workerBoard(order)
+        board.reset(given_squares)
+        board.solve(engine=engine, deadline=deadline)
+        return request_results[board.status], board.line(), time.time() - start
+    except Exception, e:
+        return 'error', str(e), time.time() - start
+
+def startServer(servers, server, service):
+    """
+    Serve the requests of a server from 'service' in a thread of its own, and add it to the
+    list of running servers.
+    """
+    server.service = service
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    servers.append(server)
+
+def main(argv=None):
+    """
+    Run the service from the command line until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Serve sudoku solves over a local socket.")
+    parser.add_argument('-p', '--port', type=int, help="TCP port of the JSON lines server on 127.0.0.1")
+    parser.add_argument('-u', '--unix', help="path of a Unix socket for the JSON lines server")
+    parser.add_argument('--http', type=int, help="TCP port of the HTTP endpoint on 127.0.0.1")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="number of worker processes (default: one per CPU)")
+    parser.add_argument('-q', '--max-pending', type=int, default=None, help="solves queued or running before requests are refused (default: four per worker)")
+    parser.add_argument('-t', '--timeout', type=float, default=default_timeout, help="most seconds a request waits for its solve")
+    parser.add_argument('-e', '--engine', choices=solve_engines, default='dlx', help="default solve engine (default: dlx)")
+    args = parser.parse_args(argv)
+
+    if args.port is None and args.unix is None and args.http is None:
+        parser.error('give at least one of --port, --unix and --http')
+
+    service = solveService(args.jobs, args.max_pending, args.timeout, args.engine)
+    servers = []
+    try:
+        if args.port is not None:
+            startServer(servers, tcpServer(('127.0.0.1', args.port), jsonLinesHandler), service)
+
+        if args.unix is not None:
+            if os.path.exists(args.unix):
+                os.remove(args.unix)
+
+            startServer(servers, unixServer(args.unix, jsonLinesHandler), service)
+
+        if args.http is not None:
+            startServer(servers, httpServer(('127.0.0.1', args.http), httpHandler), service)
+
+        sys.stderr.write('serving with %d worker processes\n' % service.jobs)
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+        if args.unix is not None and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+        service.close()
+
+    return 0
+
+
+#  m a i n   e x e c u t i o n
+if __name__ == "__main__":
+    sys.exit(main())
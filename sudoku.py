@@ -5,11 +5,35 @@ A sudoku solver.
 
 
 #  d e p e n d e n c i e s
-from itertools import combinations
+import binascii
+import sys
+import time
+
+from dlx import exactCover
 
 
 #  v a r i a b l e s
 sudoku_values = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+board_orders = [2, 3, 4, 5] # box sizes of the supported 4x4, 9x9, 16x16 and 25x25 boards
+board_indexes = {} # static square/zone/peer lookup tables, keyed by board layout
+board_zones = {} # the zones shared by the boards of a layout, keyed by board layout
+value_chars = '123456789ABCDEFGHIJKLMNOP' # the character of value v in a puzzle line is value_chars[v - 1]
+table_bits = 16 # widest candidate masks with complete lookup tables
+solve_engines = ['logic', 'dlx', 'search'] # 'logic' strategies only, or completed by exact cover or search
+board_formats = ['grid', 'line', 'candidates'] # styles of 'sudokuBoard.format()'
+solve_statuses = ['solved', 'stalled', 'unsolvable', 'timeout', 'budget'] # values of 'sudokuBoard.status' after a solve
+deadline_interval = 64 # search nodes between checks of the clock
+layout_names = ['standard', 'diagonal', 'windoku'] # extra zones of 'namedLayout()'
+named_layouts = {} # layouts built by 'namedLayout()', keyed by (name, order, regions)
+subset_sizes = [1, 2, 3, 4] # sizes of the locked sets the strategies look for: 1 at intersections, then subsets and fish (pairs and X-Wings, triples and Swordfish, quadruples and Jellyfish)
+
+
+# candidate sets are held as bit masks, with value v stored in bit (v - 1)
+all_values_mask = (1 << len(sudoku_values)) - 1
+mask_counts = [bin(m).count('1') for m in range(all_values_mask + 1)] # number of values in mask
+mask_lowest = [0] + [(m & -m).bit_length() for m in range(1, all_values_mask + 1)] # lowest value in mask
+mask_values = [[v for v in sudoku_values if m & (1 << (v - 1))] for m in range(all_values_mask + 1)]
+mask_tables = {len(sudoku_values) : (mask_counts, mask_lowest, mask_values)} # keyed by mask width
 
 
 #  f u n c t i o n s
@@ -33,16 +57,333 @@ def listsOverlap(l, m):
 
     return False
 
+def valueMask(v):
+    """
+    Return the bit mask of a single value.
+    """
+    return 1 << (v - 1)
+
+def valuesToMask(values):
+    """
+    Return the bit mask of a list of values.
+    """
+    mask = 0
+    for v in values:
+        mask |= 1 << (v - 1)
+
+    return mask
+
+def maskToValues(mask):
+    """
+    Return the sorted list of values in a bit mask.
+    """
+    if mask<=all_values_mask:
+        return list(mask_values[mask])
+
+    return [v for v in range(1, mask.bit_length() + 1) if mask & (1 << (v - 1))]
+
+def maskTables(n_values):
+    """
+    Return the (counts, lowest, values) lookup tables of the bit masks of 'n_values' values,
+    giving the number of values, the lowest value and the list of values in a mask. The tables
+    are lists indexed by mask, built the first time they are needed, except for masks of more
+    than 'table_bits' values, when they are 'maskTable's filled in as masks are looked up.
+    """
+    if n_values<=len(sudoku_values):
+        n_bits = len(sudoku_values)
+    elif n_values<=table_bits:
+        n_bits = table_bits
+    else:
+        n_bits = None
+
+    if n_bits not in mask_tables:
+        if n_bits is None:
+            counts = maskTable(lambda m: bin(m).count('1'))
+            lowest = maskTable(lambda m: (m & -m).bit_length())
+            values = maskTable(maskToValues)
+        else:
+            counts = [bin(m).count('1') for m in range(1 << n_bits)]
+            lowest = [0] + [(m & -m).bit_length() for m in range(1, 1 << n_bits)]
+            values = [[]]
+            for v in range(1, n_bits + 1):
+                values.extend([mask_list + [v] for mask_list in values])
+
+        mask_tables[n_bits] = (counts, lowest, values)
+
+    return mask_tables[n_bits]
+
+def maskSubsets(masks, k, mask_counts=mask_counts):
+    """
+    Return the combinations of k of the bit masks in list 'masks' whose union has exactly k
+    bits, as (indices, union). Partial combinations whose union already has more than k bits
+    are not extended. 'mask_counts' is the count table of the masks, if wider than 9 bits.
+    """
+    found = []
+    stack = [((), 0, 0)] # (indices, union, next index)
+    while stack:
+        indices, union, start = stack.pop()
+        if len(indices)==k:
+            if mask_counts[union]==k:
+                found.append((indices, union))
+            continue
+
+        for i in range(len(masks) - 1, start - 1, -1):
+            new_union = union | masks[i]
+            if mask_counts[new_union]<=k and len(masks) - i>=k - len(indices):
+                stack.append((indices + (i,), new_union, i + 1))
+
+    return found
+
+def lineOrder(line):
+    """
+    Return the order (box size) of the board of a puzzle line: 3 for the 81 characters of a
+    9x9 board, 4 for 256 characters (16x16) or 5 for 625 characters (25x25).
+    """
+    line = line.strip()
+    for order in board_orders:
+        if len(line)==order ** 4:
+            return order
+
+    raise ValueError("puzzle line has %d characters, expected one of %s" %
+                     (len(line), [order ** 4 for order in board_orders]))
+
+def lineToSquares(line):
+    """
+    Return the given squares of a puzzle written as a line, row by row, with '0' or '.' for an
+    empty square: {(x, y) : [value]}. Values above 9 are written 'A' (10) to 'P' (25).
+    """
+    line = line.strip()
+    n = lineOrder(line) ** 2
+    given_squares = {}
+    for k in range(len(line)):
+        c = line[k]
+        if c=='0' or c=='.':
+            continue
+
+        v = value_chars.find(c.upper()) + 1
+        if v<1 or v>n:
+            raise ValueError("unexpected character '%s' in puzzle line" % c)
+
+        given_squares[(k % n, k // n)] = [v]
+
+    return given_squares
+
+def squaresToLine(given_squares, order=3):
+    """
+    Return given squares, {(x, y) : [values]}, of a board of the given order as a line, row by
+    row, with '.' for a square that is not given or has more than one possible value.
+    """
+    n = order * order
+    chars = ['.'] * (n * n)
+    for (x, y), values in given_squares.items():
+        if len(values)==1:
+            chars[y * n + x] = value_chars[values[0] - 1]
+
+    return ''.join(chars)
+
+def stateSize(order=3):
+    """
+    Return the number of bytes of the packed state of a board of the given order: one mask of
+    order ** 2 bits for each square, 92 bytes for a 9x9 board.
+    """
+    n_values = order * order
+    return (n_values * n_values * n_values + 7) // 8
+
+def masksToBytes(masks, n_values=9):
+    """
+    Return a list of candidate masks packed 'n_values' bits each, the first mask in the most
+    significant bits, as a string of bytes.
+    """
+    n_bytes = (len(masks) * n_values + 7) // 8
+    packed = 0
+    for mask in masks:
+        packed = (packed << n_values) | mask
+
+    packed <<= n_bytes * 8 - len(masks) * n_values
+    return binascii.unhexlify('%0*x' % (2 * n_bytes, packed))
+
+def bytesToMasks(data, n_squares=81, n_values=9):
+    """
+    Return the list of 'n_squares' candidate masks packed by 'masksToBytes'. 'data' may be any
+    buffer, such as a 'memoryview' slice of a shared memory block, and is read without a copy.
+    """
+    n_bytes = (n_squares * n_values + 7) // 8
+    packed = int(binascii.hexlify(data[:n_bytes]), 16) >> (n_bytes * 8 - n_squares * n_values)
+    all_mask = (1 << n_values) - 1
+    masks = [0] * n_squares
+    for i in range(n_squares - 1, -1, -1):
+        masks[i] = packed & all_mask
+        packed >>= n_values
+
+    return masks
+
+def valueBytesToSquares(data, order=3):
+    """
+    Return the given squares, {(x, y) : [value]}, of a board written one byte per square, row by
+    row, with 0 for a square that is not given (see 'sudokuBoard.valueBytes()').
+    """
+    n = order * order
+    given_squares = {}
+    values = bytearray(data[:n * n])
+    for l in range(n * n):
+        if values[l]:
+            if values[l]>n:
+                raise ValueError("unexpected value %d in board bytes" % values[l])
+
+            given_squares[(l % n, l // n)] = [values[l]]
+
+    return given_squares
+
+def boxZones(order=3):
+    """
+    Return the boxes of a board of the given order as lists of (x, y) locations.
+    """
+    n = order * order
+    return [[(x, y) for x in range(i, i + order) for y in range(j, j + order)]
+            for i in range(0, n, order) for j in range(0, n, order)]
+
+def diagonalZones(order=3):
+    """
+    Return the two long diagonals of a board of the given order as lists of (x, y) locations.
+    """
+    n = order * order
+    return [[(i, i) for i in range(n)], [(i, n - 1 - i) for i in range(n)]]
+
+def windowZones(order=3):
+    """
+    Return the windows of windoku on a board of the given order as lists of (x, y) locations:
+    the box-sized squares set one square in from the boxes, with one square between each.
+    """
+    starts = [1 + i * (order + 1) for i in range(order - 1)]
+    return [[(x, y) for x in range(i, i + order) for y in range(j, j + order)] for i in starts for j in starts]
+
+def regionsToZones(regions):
+    """
+    Return the regions of a jigsaw puzzle written as a line, row by row, with the same character
+    for each square of a region, as lists of (x, y) locations in order of first appearance.
+    """
+    regions = regions.strip()
+    n = lineOrder(regions) ** 2
+    zones = {}
+    labels = []
+    for l in range(len(regions)):
+        if regions[l] not in zones:
+            zones[regions[l]] = []
+            labels.append(regions[l])
+
+        zones[regions[l]].append((l % n, l // n))
+
+    return [zones[label] for label in labels]
+
+def namedLayout(name='standard', order=3, regions=None):
+    """
+    Return the layout of one of the 'layout_names': the standard zones, or with the diagonals or
+    the windows of windoku as extra zones. The boxes are replaced by jigsaw 'regions', written
+    as by 'regionsToZones()', if given. Layouts are built once and shared.
+    """
+    if name not in layout_names:
+        raise ValueError("unknown layout '%s', expected one of %s" % (name, layout_names))
+
+    if regions is not None:
+        order = lineOrder(regions)
+
+    key = (name, order, regions)
+    if key not in named_layouts:
+        extra_zones = {'standard' : [], 'diagonal' : diagonalZones(order), 'windoku' : windowZones(order)}[name]
+        layout = boardLayout(order, regionsToZones(regions) if regions is not None else None, extra_zones)
+        layout.name = key
+        named_layouts[key] = layout
+
+    return named_layouts[key]
+
 
 #  c l a s s e s
-class sudokuSquare():
+class maskTable(dict):
+    """
+    A lookup table of a function of bit masks, indexed like a list, for masks too wide for a
+    complete list. Results are filled in as masks are looked up, up to 2 ** 'table_bits' of them.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self, function):
+        dict.__init__(self)
+        self.function = function
+
+    def __missing__(self, mask):
+        result = self.function(mask)
+        if len(self)<1 << table_bits:
+            self[mask] = result
+
+        return result
+
+
+class budgetExceeded(Exception):
+    """
+    Raised when a solve passes a limit of its 'solveBudget': 'limit' is 'deadline', 'nodes' or
+    'passes'.
+    """
+    def __init__(self, limit):
+        Exception.__init__(self, "solve budget exceeded: %s" % limit)
+        self.limit = limit
+
+
+class solveBudget():
+    """
+    The limits of one solve: a wall clock deadline (a 'time.time()' value), and the most search
+    nodes and propagation passes, any of which may be 'None'. The solver counts its nodes and
+    passes on the budget, which raises 'budgetExceeded' once a limit is passed. The clock is
+    read at every pass but only every 'deadline_interval' nodes, as nodes are far cheaper.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self, deadline=None, max_nodes=None, max_passes=None):
+        self.deadline = deadline
+        self.max_nodes = max_nodes
+        self.max_passes = max_passes
+        self.n_nodes = 0
+        self.n_passes = 0
+
+    #  p u b l i c   m e t h o d s
+    def node(self):
+        """
+        Count a search node.
+        """
+        self.n_nodes += 1
+        if self.max_nodes is not None and self.n_nodes>self.max_nodes:
+            raise budgetExceeded('nodes')
+
+        if self.deadline is not None and self.n_nodes % deadline_interval==0 and time.time()>self.deadline:
+            raise budgetExceeded('deadline')
+
+    def passed(self):
+        """
+        Count a propagation pass.
+        """
+        self.n_passes += 1
+        if self.max_passes is not None and self.n_passes>self.max_passes:
+            raise budgetExceeded('passes')
+
+        if self.deadline is not None and time.time()>self.deadline:
+            raise budgetExceeded('deadline')
+
+
+class sudokuSquare(object):
+    __slots__ = ('x', 'y', 'mask', 'conjugate')
+
     #  p r o t e c t e d   m e t h o d s
     def __init__(self, x=0, y=0, values=sudoku_values):
         self.x = x
         self.y = y
-        self.values = values
+        self.mask = valuesToMask(values)
         self.conjugate = 0 # could be 2, 3, 4
 
+    def __getValues__(self):
+        return maskToValues(self.mask)
+
+    def __setValues__(self, values):
+        self.mask = valuesToMask(values)
+
+    #  p r o p e r t i e s
+    values = property(__getValues__, __setValues__, doc="List view of the possible values.")
+
     #  p u b l i c   m e t h o d s
     def zones(self, all_zones):
         """
@@ -50,9 +391,7 @@ class sudokuSquare():
         """
         my_zones = []
         for zone in all_zones:
-            in_x = not (self.x<zone.xmin or self.x>zone.xmax) 
-            in_y = not (self.y<zone.ymin or self.y>zone.ymax) 
-            if in_x and in_y:
+            if zone.contains(self):
                 my_zones.append(zone)
                 
         return my_zones
@@ -61,17 +400,29 @@ class sudokuSquare():
         return (self.x, self.y)
     
     def removeValues(self, known_values=[1, 2]):
+        self.removeMask(valuesToMask(known_values))
+
+    def removeMask(self, known_mask):
+        """
+        Remove the values in bit mask 'known_mask' from the possible values.
+        """
         if not self.isKnown():
-            old_values = self.values
-            new_values = []
-            for v in old_values:
-                if not listContains(known_values, v):
-                    new_values.append(v)
-                    
-            self.values = new_values
+            self.mask &= ~known_mask
+
+    def value(self):
+        """
+        Return the lowest possible value, which is the value of a known square.
+        """
+        return (self.mask & -self.mask).bit_length()
+
+    def count(self):
+        """
+        Return the number of possible values.
+        """
+        return bin(self.mask).count('1')
 
     def isKnown(self):
-        if len(self.values)==1:
+        if self.mask and not self.mask & (self.mask - 1):
             return True
         else:
             return False
@@ -97,11 +448,26 @@ class sudokuSquare():
 
 class sudokuZone():
     #  p r o t e c t e d   m e t h o d s
-    def __init__(self, xmin=0, xmax=0, ymin=0, ymax=8):
+    def __init__(self, xmin=0, xmax=0, ymin=0, ymax=8, values=sudoku_values, locations=None):
+        """
+        The initialisation method. The zone is the rectangle of squares within the bounds, or
+        the set of (x, y) 'locations' if given, within the same bounds.
+        """
+        if locations is not None:
+            locations = frozenset(locations)
+            xmin = min([x for x, y in locations])
+            xmax = max([x for x, y in locations])
+            ymin = min([y for x, y in locations])
+            ymax = max([y for x, y in locations])
+
         self.xmin = xmin
         self.xmax = xmax
         self.ymin = ymin
         self.ymax = ymax
+        self.locations = locations
+        self.values = values # the values each placed once in the zone
+        self.cells = None # board indices of the member squares, set by the board index
+        self.mask_counts, self.mask_lowest, self.mask_values = maskTables(len(values))
 
     def __testSquares__(self, all_squares, test=True):
         """
@@ -115,15 +481,30 @@ class sudokuZone():
         return test_squares
 
     #  p u b l i c   m e t h o d s
+    def contains(self, square):
+        """
+        Return 'True' if this zone includes the given square.
+        """
+        if self.locations is not None:
+            return square.location() in self.locations
+
+        in_x = not (square.x<self.xmin or square.x>self.xmax) 
+        in_y = not (square.y<self.ymin or square.y>self.ymax) 
+        return in_x and in_y
+
     def squares(self, all_squares):
         """
         Return the subset of all squares contained within this zone.
+
+        Once the zone has been indexed by a board, 'all_squares' must be that board's list of
+        squares and the members are looked up directly.
         """
+        if self.cells is not None:
+            return [all_squares[k] for k in self.cells]
+
         my_squares = []
         for square in all_squares:
-            in_x = not (square.x<self.xmin or square.x>self.xmax) 
-            in_y = not (square.y<self.ymin or square.y>self.ymax) 
-            if in_x and in_y:
+            if self.contains(square):
                 my_squares.append(square)
                 
         return my_squares
@@ -146,7 +527,7 @@ class sudokuZone():
         """
         known_values = []
         for square in self.knownSquares(all_squares):
-            known_values.append(square.values[0])
+            known_values.append(square.value())
 
         return known_values
     
@@ -156,7 +537,7 @@ class sudokuZone():
         """
         unknown_values = []
         for square in self.unknownSquares(all_squares):
-            unknown_values.append(square.values[0])
+            unknown_values.append(square.value())
 
         return unknown_values
     
@@ -165,9 +546,10 @@ class sudokuZone():
         Return list of squares which could have a given value.
         """
         my_squares = self.squares(all_squares)
+        value_mask = valueMask(value)
         allowed_squares = []
         for square in my_squares:
-            if listContains(square.values, value):
+            if square.mask & value_mask:
                 allowed_squares.append(square)
 
         return allowed_squares
@@ -176,276 +558,356 @@ class sudokuZone():
         """
         Return a dictionary of values with only 'f' possible locations: {value : [squares]}
         """
+        allowed_squares = {}
+        for v in self.values:
+            allowed_squares[v] = []
+
+        mask_values = self.mask_values
+        for square in self.squares(all_squares):
+            for v in mask_values[square.mask]:
+                allowed_squares[v].append(square)
+
         sets = {}
-        for v in sudoku_values:
-            allowed_squares = self.squaresAllowedValue(v, all_squares)
-            if len(allowed_squares)==f:
-                sets[v] = allowed_squares
+        for v in self.values:
+            if len(allowed_squares[v])==f:
+                sets[v] = allowed_squares[v]
 
         return sets
 
+    def candidateTable(self, all_squares):
+        """
+        Return (squares, masks, positions) for this zone: the member squares, their possible
+        values as bit masks and, for each value v, the bit mask of the positions in 'squares'
+        which could have that value (positions[v - 1]).
+        """
+        squares = self.squares(all_squares)
+        masks = []
+        positions = [0] * len(self.values)
+        mask_values = self.mask_values
+        for i in range(len(squares)):
+            mask = squares[i].mask
+            masks.append(mask)
+            for v in mask_values[mask]:
+                positions[v - 1] |= 1 << i
+
+        return squares, masks, positions
+
+    def subsets(self, k, all_squares, hidden=True, table=None):
+        """
+        Return a list of the subsets of size k in this zone as (squares, values mask):
+
+          naked  : k unknown squares which together could only have k values
+          hidden : k values which together could only be in k squares
+
+        'table' is the zone's 'candidateTable', if already computed.
+        """
+        if table is None:
+            table = self.candidateTable(all_squares)
+
+        squares, masks, positions = table
+        mask_counts = self.mask_counts
+        found = []
+        if hidden:
+            values = [v for v in self.values if mask_counts[positions[v - 1]]>=2 and mask_counts[positions[v - 1]]<=k]
+            for indices, union in maskSubsets([positions[v - 1] for v in values], k, mask_counts):
+                values_mask = 0
+                for i in indices:
+                    values_mask |= valueMask(values[i])
+
+                found.append(([squares[i] for i in range(len(squares)) if union & (1 << i)], values_mask))
+        else:
+            members = [i for i in range(len(squares)) if mask_counts[masks[i]]>=2 and mask_counts[masks[i]]<=k]
+            for indices, union in maskSubsets([masks[i] for i in members], k, mask_counts):
+                found.append(([squares[members[i]] for i in indices], union))
+
+        return found
+
+    def hiddenSubsetSquares(self, k, all_squares):
+        """
+        Return a dictionary of the squares of hidden subsets of size k, with the subset values
+        each could have: {location : [values]}
+        """
+        subset_squares = {}
+        for squares, values_mask in self.subsets(k, all_squares, hidden=True):
+            for square in squares:
+                subset_squares[square.location()] = maskToValues(square.mask & values_mask)
+
+        return subset_squares
+
     def pairSquares(self, all_squares):
         """
         Return a dictionary of locations with two possible values values with only two possible
         locations: {location : [a, b]}
         """
-        # get list of values with only 2 possible locations, with those locations
-        twos = self.valueFrequency(2, all_squares)
-
-        # quick check : at least two such values are required for a pair
-        if len(twos.keys())<2:
-            return {}
-        
-        # prepare list of these values
-        values = twos.keys()
-        
-        # prepare list of possible squares
-        squares = []
-
-        for k in twos.keys():
-            for s in twos[k]:
-                if not listContains(squares, s):
-                    squares.append(s)
-        
-        # quick check : if there are only two values, there must be two squares 
-        if len(values)==2 and len(squares)!=2:
-            return {}
-        
-        # look for pairs
-        pairs = {}
-        for two_squares in combinations(squares, 2):
-            for two_values in combinations(values, 2):
-                square_values = []
-                for this_square in two_squares:
-                    square_values.append([])
-                    for this_value in two_values:
-                        if listContains(this_square.values, this_value): 
-                            square_values[-1].append(this_value)
-                
-                # check two squares each have two values
-                test = True
-                for this_square_values in square_values:
-                    test = test and len(this_square_values)==2
-                    
-                if not test: continue
-                
-                # check two values each occur in two squares
-                value_tally = {}
-                for this_value in two_values:
-                    value_tally[this_value] = 0
-                
-                for this_square_values in square_values:
-                    for this_value in this_square_values:
-                        value_tally[this_value] += 1
-
-                for this_value in value_tally.keys():
-                    test = test and value_tally[this_value]==2
-                    
-                if not test: continue
-                
-                # new pair found
-                for i in range(len(two_squares)):
-                    pairs[two_squares[i].location()] = square_values[i]
-            
-        return pairs
+        return self.hiddenSubsetSquares(2, all_squares)
 
     def tripleSquares(self, all_squares):
         """
         Return a dictionary of locations with two or three possible values that, combined, have only three possible
         locations: {location : [a, b(, c)]}
         """
-        # get list of values with only 2, 3 possible locations, with those locations
-        twos = self.valueFrequency(2, all_squares)
-        threes = self.valueFrequency(3, all_squares)
+        return self.hiddenSubsetSquares(3, all_squares)
 
-        # quick check : at least three such values are required for a triple
-        if (len(twos.keys()) + len(threes.keys()))<3:
-            return {}
-        
-        # prepare list of these values
-        values = twos.keys()
-        for k in threes.keys():
-            if not listContains(values, k):
-                values.append(k)
-                
-        # prepare list of possible squares
-        squares = []
-        pairs = self.pairSquares(all_squares)
-        for k in twos.keys():
-            for s in twos[k]:
-                if (not listContains(squares, s)) and (not listContains(pairs.keys(), s)):
-                    squares.append(s)
-
-        for k in threes.keys():
-            for s in threes[k]:
-                if not listContains(squares, s):
-                    squares.append(s)
-        
-        # quick check : if there are only three values, there must be three squares 
-        if len(values)==3 and len(squares)!=3:
-            return {}
-        
-        # look for triples
-        triples = {}
-        for three_squares in combinations(squares, 3):
-            for three_values in combinations(values, 3):
-                square_values = []
-                for this_square in three_squares:
-                    square_values.append([])
-                    for this_value in three_values:
-                        if listContains(this_square.values, this_value): 
-                            square_values[-1].append(this_value)
-                
-                # check three squares each have two or three values
-                test = True
-                for this_square_values in square_values:
-                    test = test and (len(this_square_values)==2 or len(this_square_values)==3)
+    def quadrupleSquares(self, all_squares):
+        """
+        Return a dictionary of locations with two or three possible values that, combined, have only three possible
+        locations: {location : [a, b(, c(, d))]}
+        """
+        return self.hiddenSubsetSquares(4, all_squares)
 
-                if not test: continue
-                
-                # check three values each occur in two or three squares
-                value_tally = {}
-                for this_value in three_values:
-                    value_tally[this_value] = 0
-                
-                for this_square_values in square_values:
-                    for this_value in this_square_values:
-                        value_tally[this_value] += 1
+    
+class solveObserver():
+    """
+    The interface of a 'sudokuBoard' observer, which does nothing. Observers override the
+    methods for the events they want.
+    """
+    def strategy(self, name, seconds, eliminated):
+        """
+        A strategy has run for 'seconds' and removed 'eliminated' possible values.
+        """
+        pass
 
-                for this_value in value_tally.keys():
-                    if listContains(twos.keys(), this_value):
-                        test = test and value_tally[this_value]==2
-                    else:
-                        test = test and value_tally[this_value]==3
+    def change(self, square, old_mask, new_mask, strategy):
+        """
+        The possible values of 'square' have changed from 'old_mask' to 'new_mask', in the named
+        strategy (or 'None' outside the strategies).
+        """
+        pass
 
-                if not test: continue
+    def finished(self, engine, solved, passes, seconds):
+        """
+        A solve has finished after 'passes' propagation passes and 'seconds'.
+        """
+        pass
 
-                # new triple found
-                for i in range(len(three_squares)):
-                    triples[three_squares[i].location()] = square_values[i]
-            
-        return triples
 
-    def quadrupleSquares(self, all_squares):
+class strategyScheduler():
+    """
+    The ladder of zone strategies run by 'sudokuBoard.__propagate__'. Each strategy is
+    registered with an estimate of the seconds of a call, and the ladder is ordered by the
+    expected seconds per value eliminated, from that estimate and the calls measured so far,
+    so the order adapts over a run: strategies which rarely eliminate anything, such as the
+    quadruple search, sink to the top of the ladder and are only tried when the rest stall.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self):
+        self.strategies = [] # (name, board method, subset size or 'None'), in registration order
+        self.costs = {}
+        self.calls = {}
+        self.seconds = {}
+        self.eliminated = {}
+
+    #  p u b l i c   m e t h o d s
+    def register(self, method, cost, subset_size=None):
         """
-        Return a dictionary of locations with two or three possible values that, combined, have only three possible
-        locations: {location : [a, b(, c(, d))]}
+        Add the 'sudokuBoard' method of the given name to the ladder, estimated to take 'cost'
+        seconds a call. A strategy with a 'subset_size' only runs on boards whose
+        'subset_sizes' include it.
         """
-        # get list of values with only 2, 3, 4 possible locations, with those locations
-        twos = self.valueFrequency(2, all_squares)
-        threes = self.valueFrequency(3, all_squares)
-        fours = self.valueFrequency(4, all_squares)
+        name = method.strip('_')
+        self.strategies.append((name, method, subset_size))
+        self.costs[name] = cost
+        self.calls[name] = 0
+        self.seconds[name] = 0.0
+        self.eliminated[name] = 0
 
-        # quick check : at least four such values are required for a quadruple
-        if (len(twos.keys()) + len(threes.keys()) + len(fours.keys()))<4:
-            return {}
-        
-        # prepare list of these values
-        values = twos.keys()
-        for k in threes.keys():
-            if not listContains(values, k):
-                values.append(k)
-                
-        for k in fours.keys():
-            if not listContains(values, k):
-                values.append(k)
-                
-        # prepare list of possible squares
-        squares = []
-        pairs = self.pairSquares(all_squares)
-        for k in twos.keys():
-            for s in twos[k]:
-                if (not listContains(squares, s)) and (not listContains(pairs.keys(), s)):
-                    squares.append(s)
-
-        for k in threes.keys():
-            for s in threes[k]:
-                if not listContains(squares, s):
-                    squares.append(s)
-        
-        for k in fours.keys():
-            for s in fours[k]:
-                if not listContains(squares, s):
-                    squares.append(s)
-        
-        # quick check : if there are only four values, there must be four squares 
-        if len(values)==4 and len(squares)!=4:
-            return {}
-        
-        # look for triples
-        quadruples = {}
-        for four_squares in combinations(squares, 4):
-            for four_values in combinations(values, 4):
-                square_values = []
-                for this_square in four_squares:
-                    square_values.append([])
-                    for this_value in four_values:
-                        if listContains(this_square.values, this_value): 
-                            square_values[-1].append(this_value)
-                
-                # check four squares each have two, three or four values
-                test = True
-                for this_square_values in square_values:
-                    test = test and (len(this_square_values)==2 or len(this_square_values)==3 or len(this_square_values)==4)
+    def rate(self, name):
+        """
+        Return the expected seconds per value eliminated of a strategy, counting its estimate as
+        one call which eliminated one value.
+        """
+        return (self.costs[name] + self.seconds[name]) / (1.0 + self.eliminated[name])
+
+    def ladder(self, subset_sizes):
+        """
+        Return the (name, method) of each strategy allowed by 'subset_sizes', cheapest per value
+        eliminated first.
+        """
+        ladder = []
+        for i in range(len(self.strategies)):
+            name, method, subset_size = self.strategies[i]
+            if subset_size is None or subset_size in subset_sizes:
+                ladder.append((self.rate(name), i, name, method))
+
+        ladder.sort()
+        return [(name, method) for rate, i, name, method in ladder]
+
+    def record(self, name, seconds, eliminated):
+        """
+        Count a call of a strategy which took 'seconds' and eliminated 'eliminated' values.
+        """
+        self.calls[name] += 1
+        self.seconds[name] += seconds
+        self.eliminated[name] += eliminated
+
+    def report(self):
+        """
+        Return the statistics of the strategies as a text table, in ladder order.
+        """
+        lines = ['%-24s %8s %10s %12s %14s' % ('strategy', 'calls', 'eliminated', 'seconds', 'per value')]
+        for name, method in self.ladder([size for name, method, size in self.strategies]):
+            lines.append('%-24s %8d %10d %12.6f %14.9f' % (name, self.calls[name], self.eliminated[name], self.seconds[name], self.rate(name)))
+
+        return '\n'.join(lines)
+
+
+class boardLayout(object):
+    """
+    The zones of a board as lists of (x, y) locations, compiled by 'sudokuBoard' into its
+    static index: the columns, the rows, the regions which take the place of the boxes (the
+    boxes themselves unless jigsaw regions are given) and any extra zones, such as diagonals or
+    windows. A zone of as many squares as there are values holds each value exactly once, and a
+    smaller extra zone holds each value at most once.
+    """
+    #  p r o t e c t e d   m e t h o d s
+    def __init__(self, order=3, regions=None, extra_zones=[]):
+        """
+        The initialisation method. The zones are validated, raising a 'ValueError' if the
+        regions do not divide the board into order ** 2 regions of as many squares, or if an
+        extra zone has a square off the board or twice, fewer than two or more squares than
+        there are values, or the same squares as another zone.
+        """
+        if order not in board_orders:
+            raise ValueError("unsupported board order %s, expected one of %s" % (order, board_orders))
+
+        n = order * order
+        self.order = order
+        if regions is None:
+            regions = boxZones(order)
+
+        regions = [self.__checkZone__(cells, 'region') for cells in regions]
+        if len(regions)!=n or [len(cells) for cells in regions]!=[n] * n:
+            raise ValueError("expected %d regions of %d squares, found sizes %s" % (n, n, sorted([len(cells) for cells in regions])))
+
+        if len(set(sum(regions, [])))!=n * n:
+            raise ValueError("the regions overlap")
+
+        extra_zones = [self.__checkZone__(cells, 'extra zone') for cells in extra_zones]
+        columns = [[(x, y) for y in range(n)] for x in range(n)]
+        rows = [[(x, y) for x in range(n)] for y in range(n)]
+        self.zones = columns + rows + regions + extra_zones # columns first, then rows
+        self.key = tuple([tuple(sorted(cells)) for cells in self.zones]) # identifies the index of the layout
+        if len(set(self.key))!=len(self.key):
+            raise ValueError("two zones have the same squares")
+
+        self.name = None # the arguments of 'namedLayout()', for the layouts it builds
+
+    def __reduce__(self):
+        """
+        Pickle a named layout as the arguments of 'namedLayout()', so that it unpickles as the
+        shared layout itself, and any other as its order, regions and extra zones, rather than
+        as all of its zones and key.
+        """
+        if self.name is not None:
+            return namedLayout, self.name
+
+        n = self.order * self.order
+        return boardLayout, (self.order, self.zones[2 * n:3 * n], self.zones[3 * n:])
+
+    def __checkZone__(self, cells, kind):
+        """
+        Return the locations of a zone as a list, raising a 'ValueError' if it is invalid.
+        """
+        n = self.order * self.order
+        cells = [tuple(location) for location in cells]
+        for x, y in cells:
+            if x<0 or x>=n or y<0 or y>=n:
+                raise ValueError("%s square (%s, %s) is off the board" % (kind, x, y))
+
+        if len(set(cells))!=len(cells):
+            raise ValueError("%s has a square twice" % kind)
+
+        if len(cells)<2 or len(cells)>n:
+            raise ValueError("%s has %d squares, expected 2 to %d" % (kind, len(cells), n))
+
+        return cells
 
-                if not test: continue
-                
-                # check four values each occur in two, three or four squares
-                value_tally = {}
-                for this_value in four_values:
-                    value_tally[this_value] = 0
-                
-                for this_square_values in square_values:
-                    for this_value in this_square_values:
-                        value_tally[this_value] += 1
-                        
-                for this_value in value_tally.keys():
-                    if listContains(twos.keys(), this_value):
-                        test = test and value_tally[this_value]==2
-                    elif listContains(threes.keys(), this_value):
-                        test = test and value_tally[this_value]==3
-                    else:
-                        test = test and value_tally[this_value]==4
-                        
-                if not test: continue
-                
-                # new quadruple found
-                for i in range(len(four_squares)):
-                    quadruples[four_squares[i].location()] = square_values[i]
-            
-        return quadruples
 
-    
 class sudokuBoard():
     """
     """
     #  p r o p e r t i e s
+    order = 3
     size = [9, 9]
+    box_size = [3, 3]
     n_squares = size[0] * size[1]
+    values = sudoku_values
     
     #  p r o t e c t e d   m e t h o d s
-    def __init__(self, given_squares):
+    def __init__(self, given_squares, quiet=True, observer=None, order=3, scheduler=None, layout=None):
         """
-        The initialisation method. 
+        The initialisation method. The board has boxes of 'order' x 'order' squares and values
+        1 to order ** 2, so 3 gives the standard 9x9 board and 4 and 5 give 16x16 and 25x25
+        boards. Nothing is printed unless 'quiet' is cleared, when the board is drawn. If given,
+        the 'observer' is told of each strategy run and each change of possible values (see
+        'solveObserver'). The zone strategies are ordered by the 'scheduler', by default the
+        'default_scheduler' shared by the boards of the process. A 'boardLayout' gives the
+        zones of a variant puzzle, and then the order; by default the layout is standard.
         """
+        if layout is not None:
+            order = layout.order
+        elif order not in board_orders:
+            raise ValueError("unsupported board order %s, expected one of %s" % (order, board_orders))
+        else:
+            layout = namedLayout('standard', order)
+
+        if order!=self.order:
+            n = order * order
+            self.order = order
+            self.size = [n, n]
+            self.box_size = [order, order]
+            self.n_squares = n * n
+            self.values = list(range(1, n + 1))
+
+        self.mask_counts, self.mask_lowest, self.mask_values = maskTables(len(self.values))
+        self.all_mask = valuesToMask(self.values)
+        self.layout = layout
+        self.subset_sizes = list(subset_sizes) # subset sizes the strategies look for, narrowed to grade a puzzle
+        self.observer = observer
+        self.scheduler = scheduler if scheduler is not None else default_scheduler
+        self.strategy = None # name of the running strategy, for the observer
+        self.trail = None # (square index, old mask) of each change since the first checkpoint
+        self.budget = None # the 'solveBudget' of the running solve, if limited
+        self.status = None # how the last solve ended, one of 'solve_statuses'
+        self.table_masks = None # the possible values the zone value tables were last built for
         self.__defineZones__()
         self.__defineSquares__(given_squares)
-        self.draw()
-        
+        self.__defineIndex__()
+        self.__resetPropagation__()
+        if not quiet:
+            self.draw()
+
+    def __getstate__(self):
+        """
+        Pickle the board as its order, packed state and subset sizes, rather than as its
+        squares and zones, and as its layout too unless that is standard; the observer and
+        scheduler are not kept.
+        """
+        state = {'order' : self.order, 'state' : self.state(), 'subset_sizes' : self.subset_sizes}
+        if self.layout.name!=('standard', self.order, None):
+            state['layout'] = self.layout
+
+        return state
+
+    def __setstate__(self, state):
+        """
+        Unpickle a board pickled by '__getstate__', with the default scheduler.
+        """
+        self.__init__({}, order=state['order'], layout=state.get('layout'))
+        self.loadState(state['state'])
+        self.subset_sizes = state['subset_sizes']
+
     def __defineZones__(self):
         """
-        Create list of the zones on the board. 
+        Create list of the zones on the board, from its layout: the columns, the rows, the
+        regions (by default the boxes) and any extra zones. The zones hold no state of their
+        own, so the boards of a layout share them.
         """
-        self.zones = []
-        for i in range(self.size[0]):
-            self.zones.append(sudokuZone(xmin=i, xmax=i, ymin=0, ymax=self.size[1]))
+        key = self.layout.key
+        if key not in board_zones:
+            board_zones[key] = [sudokuZone(values=self.values, locations=cells) for cells in self.layout.zones]
 
-        for j in range(self.size[1]):
-            self.zones.append(sudokuZone(xmin=0, xmax=self.size[0], ymin=j, ymax=j))
-            
-        for i in range(0, self.size[0], 3):
-            for j in range(0, self.size[1], 3):
-                self.zones.append(sudokuZone(xmin=i, xmax=i+2, ymin=j, ymax=j+2))
+        self.zones = board_zones[key]
      
     def __defineSquares__(self, given_squares):
         """
@@ -454,33 +916,246 @@ class sudokuBoard():
         self.squares = []
         for i in range(self.size[0]):
             for j in range(self.size[1]):
-                init_values = sudoku_values
-                for k in given_squares.keys():
-                    if (i, j)==k:
-                        init_values = given_squares[k]
-                        
+                init_values = given_squares.get((i, j), self.values)
                 self.squares.append(sudokuSquare(x=i, y=j, values=init_values))
                 
+    def __defineIndex__(self):
+        """
+        Look up the static tables relating squares, zones and peers, compiling them from the
+        layout the first time a board of this layout is created:
+
+          zone_cells[z]       : board indices of the squares in zone z
+          zone_complete[z]    : 'True' if zone z has a square for every value, so that each
+                                value must be placed in it, rather than placed at most once
+          cell_zones[k]       : zone indices of the zones including square k
+          cell_peers[k]       : board indices of the other squares sharing a zone with square k
+          cell_slots[k]       : (slot, bit) for each zone z including square k, where square k
+                                is at position i of zone_cells[z], bit is 1 << i and slot + v is
+                                the index of value v of zone z in the zone value tables
+          intersections[i]    : (zone a, zone b, shared squares, rest of a, rest of b) for each
+                                pair of zones sharing more than one square, e.g. a box and a row
+          zone_crossings[z]   : indices of the intersections of zone z
+          fish_grids          : (base zones, cover zones, cells) for the rows across the columns
+                                and the columns across the rows, where cells[i][j] is the board
+                                index of the square of base zone i in cover zone j
+
+        Square k is at location (k // size[1], k % size[1]).
+        """
+        key = self.layout.key
+        if key not in board_indexes:
+            zone_cells = []
+            for zone in self.zones:
+                zone_cells.append(sorted([x * self.size[1] + y for x, y in zone.locations]))
+
+            zone_complete = [len(cells)==len(self.values) for cells in zone_cells]
+
+            cell_zones = [[] for k in range(self.n_squares)]
+            for z in range(len(zone_cells)):
+                for k in zone_cells[z]:
+                    cell_zones[k].append(z)
+
+            cell_peers = []
+            for k in range(self.n_squares):
+                peers = set()
+                for z in cell_zones[k]:
+                    peers.update(zone_cells[z])
+
+                peers.discard(k)
+                cell_peers.append(sorted(peers))
+
+            n_values = len(self.values)
+            cell_slots = [[] for k in range(self.n_squares)]
+            for z in range(len(zone_cells)):
+                for i in range(len(zone_cells[z])):
+                    cell_slots[zone_cells[z][i]].append((z * n_values - 1, 1 << i))
+
+            intersections = []
+            zone_crossings = [[] for z in range(len(zone_cells))]
+            for a in range(len(zone_cells)):
+                for b in range(a + 1, len(zone_cells)):
+                    shared = set(zone_cells[a]) & set(zone_cells[b])
+                    if len(shared)>1:
+                        zone_crossings[a].append(len(intersections))
+                        zone_crossings[b].append(len(intersections))
+                        intersections.append((a, b, sorted(shared),
+                                              [k for k in zone_cells[a] if k not in shared],
+                                              [k for k in zone_cells[b] if k not in shared]))
+
+            columns = list(range(self.size[0]))
+            rows = list(range(self.size[0], self.size[0] + self.size[1]))
+            grid = [[(set(zone_cells[r]) & set(zone_cells[c])).pop() for c in columns] for r in rows]
+            fish_grids = [(rows, columns, grid), (columns, rows, [list(cells) for cells in zip(*grid)])]
+            board_indexes[key] = (zone_cells, zone_complete, cell_zones, cell_peers, cell_slots, intersections, zone_crossings, fish_grids)
+
+        (self.zone_cells, self.zone_complete, self.cell_zones, self.cell_peers, self.cell_slots,
+         self.intersections, self.zone_crossings, self.fish_grids) = board_indexes[key]
+        for z in range(len(self.zones)):
+            self.zones[z].cells = self.zone_cells[z]
+
+        self.square_indices = {}
+        for k in range(self.n_squares):
+            self.square_indices[self.squares[k].location()] = k
+                
+    def __resetPropagation__(self):
+        """
+        Recount the board and queue everything for propagation: every known square for
+        removal of its value from its peers, and every zone for the zone strategies.
+
+        The zone value tables are rebuilt, unless the possible values are those they were last
+        built for, and from then on kept up to date by '__setMask__()' and 'rollback()': for
+        value v of zone z, at index z * len(values) + v - 1,
+
+          value_positions : bit mask of the positions in zone_cells[z] which could have v
+          value_counts    : number of those positions
+        """
+        self.n_known = 0
+        self.n_possible = 0
+        self.n_changes = 0
+        self.known_queue = []
+        mask_counts = self.mask_counts
+        masks = [square.mask for square in self.squares]
+        for k in range(self.n_squares):
+            mask = masks[k]
+            self.n_possible += mask_counts[mask]
+            if mask_counts[mask]==1:
+                self.n_known += 1
+                self.known_queue.append(k)
+
+        if masks!=self.table_masks:
+            mask_values = self.mask_values
+            positions = [0] * (len(self.zones) * len(self.values))
+            for k in range(self.n_squares):
+                for slot, bit in self.cell_slots[k]:
+                    for v in mask_values[masks[k]]:
+                        positions[slot + v] |= bit
+
+            self.value_positions = positions
+            self.value_counts = [mask_counts[p] for p in positions]
+            self.table_masks = masks
+
+        self.zone_changes = [0] * len(self.zones)
+        self.zone_seen = {} # zone_changes as each strategy last saw them, none yet
+
+    def __setMask__(self, k, mask):
+        """
+        Set the possible values of square k, keeping the running counts and zone value tables,
+        queueing the square and its zones for re-examination and, after a checkpoint, recording
+        the change on the trail. Return 'True' if the values changed.
+        """
+        square = self.squares[k]
+        old_mask = square.mask
+        if mask==old_mask:
+            return False
+
+        if self.trail is not None:
+            self.trail.append((k, old_mask))
+
+        square.mask = mask
+        self.table_masks = None
+        mask_counts = self.mask_counts
+        self.n_changes += 1
+        self.n_possible += mask_counts[mask] - mask_counts[old_mask]
+        if mask_counts[mask]==1:
+            self.n_known += 1
+            self.known_queue.append(k)
+
+        if mask_counts[old_mask]==1:
+            self.n_known -= 1
+
+        zone_changes = self.zone_changes
+        for z in self.cell_zones[k]:
+            zone_changes[z] += 1
+
+        if mask & ~old_mask:
+            self.__updateZoneValues__(k, old_mask, mask)
+        else:
+            positions = self.value_positions
+            counts = self.value_counts
+            removed = self.mask_values[old_mask & ~mask]
+            for slot, bit in self.cell_slots[k]:
+                for v in removed:
+                    positions[slot + v] &= ~bit
+                    counts[slot + v] -= 1
+
+        if self.observer is not None:
+            self.observer.change(square, old_mask, mask, self.strategy)
+
+        return True
+
+    def __updateZoneValues__(self, k, old_mask, mask):
+        """
+        Update the zone value tables for a change of the possible values of square k.
+        """
+        positions = self.value_positions
+        counts = self.value_counts
+        removed = self.mask_values[old_mask & ~mask]
+        added = self.mask_values[mask & ~old_mask]
+        for slot, bit in self.cell_slots[k]:
+            for v in removed:
+                positions[slot + v] &= ~bit
+                counts[slot + v] -= 1
+
+            for v in added:
+                positions[slot + v] |= bit
+                counts[slot + v] += 1
+
+    def __setBudget__(self, deadline, max_nodes, max_passes):
+        """
+        Set a new budget with the given limits, if there are any, for a solve or search. Return
+        the budget it replaces, to be put back when the solve or search ends.
+        """
+        budget = self.budget
+        if deadline is not None or max_nodes is not None or max_passes is not None:
+            self.budget = solveBudget(deadline, max_nodes, max_passes)
+
+        return budget
+
+    def __runScheduled__(self, name, method, zones):
+        """
+        Run a strategy of the scheduler on the given zones, timing it and counting the values
+        it removes for the scheduler and the observer.
+        """
+        self.strategy = name
+        n_possible = self.n_possible
+        start = time.time()
+        try:
+            getattr(self, method)(zones)
+        finally:
+            seconds = time.time() - start
+            self.scheduler.record(name, seconds, n_possible - self.n_possible)
+            if self.observer is not None:
+                self.observer.strategy(name, seconds, n_possible - self.n_possible)
+
+            self.strategy = None
+
+    def __runStrategy__(self, method, *args):
+        """
+        Run a strategy method, timing it and counting the values it removes for the observer.
+        """
+        if self.observer is None:
+            return method(*args)
+
+        name = method.__name__.strip('_')
+        self.strategy = name
+        n_possible = self.n_possible
+        start = time.time()
+        try:
+            return method(*args)
+        finally:
+            self.observer.strategy(name, time.time() - start, n_possible - self.n_possible)
+            self.strategy = None
+
     def __countKnownSquares__(self):
         """
         Return number of known squares on the board.
         """
-        known = 0
-        for square in self.squares:
-            if square.isKnown():
-                known += 1
-                
-        return known
+        return self.n_known
     
     def __countPossibleValues__(self):
         """
         Return number of possible values for all squares on the board.
         """
-        n_possible = 0
-        for square in self.squares:
-            n_possible += len(square.values)
-                
-        return n_possible
+        return self.n_possible
     
     def __isSolved__(self):
         if self.__countKnownSquares__()==self.n_squares:
@@ -488,313 +1163,891 @@ class sudokuBoard():
         else:
             return False
 
+    def __isConsistent__(self, zones=None):
+        """
+        Return 'False' if the possible values contradict themselves in any of the given zones
+        (default: all of them): a square with no possible value, a value known in two squares
+        of a zone, or a value with no possible square in a zone which must hold every value.
+        """
+        if zones is None:
+            zones = range(len(self.zones))
+
+        mask_counts = self.mask_counts
+        for z in zones:
+            known = 0
+            union = 0
+            for k in self.zone_cells[z]:
+                mask = self.squares[k].mask
+                if mask_counts[mask]==1:
+                    if known & mask:
+                        return False
+
+                    known |= mask
+                elif mask==0:
+                    return False
+
+                union |= mask
+
+            if union!=self.all_mask and self.zone_complete[z]:
+                return False
+
+        return True
+
+    def __trailZones__(self, checkpoint):
+        """
+        Return the set of zones with a square changed since the checkpoint.
+        """
+        zones = set()
+        cell_zones = self.cell_zones
+        for i in range(checkpoint, len(self.trail)):
+            zones.update(cell_zones[self.trail[i][0]])
+
+        return zones
+
+    def __branchSquare__(self):
+        """
+        Return the index of the unknown square with the fewest possible values, or 'None' if
+        every square is known.
+        """
+        mask_counts = self.mask_counts
+        best = None
+        best_count = None
+        for k in range(self.n_squares):
+            count = mask_counts[self.squares[k].mask]
+            if count>1 and (best_count is None or count<best_count):
+                best = k
+                best_count = count
+                if count==2:
+                    break
+
+        return best
+
     def __removeKnownValues__(self):
         """
-        Remove known values from possible values of squares in the same zone.
+        Remove known values from possible values of squares in the same zone, for each square
+        which has become known since the last call.
         """
-        for square in self.squares:
-            known_values = []
-            for zone in square.zones(self.zones):
-                known_values.extend(zone.knownValues(self.squares))
-
-            if not square.isKnown():
-                if listsOverlap(square.values, known_values):
-                    #print 'Remove known\t', square.location(), ':', square.values, '-->', 
-                    square.removeValues(known_values)
-                    #print square.values
+        mask_counts = self.mask_counts
+        while self.known_queue:
+            k = self.known_queue.pop()
+            known_mask = self.squares[k].mask
+            if mask_counts[known_mask]!=1:
+                continue
+
+            for p in self.cell_peers[k]:
+                peer_mask = self.squares[p].mask
+                if peer_mask & known_mask and mask_counts[peer_mask]!=1:
+                    self.__setMask__(p, peer_mask & ~known_mask)
             
-    def __assignUniqueValues__(self):
+    def __removeMaskFrom__(self, cells, mask):
         """
-        Assign value to square if that is the only possible location within a zone.
+        Remove the values of a bit mask from the possible values of each of the given squares
+        which is not yet known, so that a contradiction never blanks a known square.
         """
-        for zone in self.zones:
-            singles = zone.valueFrequency(1, self.squares)
-            for v in singles.keys():
-                for square in self.squares:
-                    if square.location()==singles[v][0].location():
-                        if not square.isKnown():
-                            #print 'Assign value\t', square.location(), ':', square.values, '-->', 
-                            square.values = [v]
-                            square.conjugate = 1
-                            #print square.values
+        if not mask:
+            return
+
+        squares = self.squares
+        mask_counts = self.mask_counts
+        for k in cells:
+            square_mask = squares[k].mask
+            if square_mask & mask and mask_counts[square_mask]!=1:
+                self.__setMask__(k, square_mask & ~mask)
+
+    def __assignUniqueValues__(self, zones):
+        """
+        Assign value to square if that is the only possible location within a zone, for each
+        of the given zones which must hold every value. The single locations are read from the
+        zone value tables.
+        """
+        squares = self.squares
+        counts = self.value_counts
+        positions = self.value_positions
+        mask_counts = self.mask_counts
+        mask_lowest = self.mask_lowest
+        n_values = len(self.values)
+        for z in zones:
+            if not self.zone_complete[z]:
+                continue
+
+            slot = z * n_values - 1
+            for v in self.values:
+                if counts[slot + v]!=1:
+                    continue
+
+                k = self.zone_cells[z][mask_lowest[positions[slot + v]] - 1]
+                if mask_counts[squares[k].mask]!=1:
+                    self.__setMask__(k, valueMask(v))
+                    squares[k].conjugate = 1
+
+    def __candidateTable__(self, z):
+        """
+        Return the 'sudokuZone.candidateTable()' of zone z, with the positions of each value
+        read from the zone value tables.
+        """
+        squares = [self.squares[k] for k in self.zone_cells[z]]
+        slot = z * len(self.values)
+        return squares, [square.mask for square in squares], self.value_positions[slot:slot + len(self.values)]
+
+    def __assignSubsetValues__(self, zones, k):
+        """
+        In each of the given zones, for hidden subsets of k squares which must contain k values,
+        remove other possibilities; then remove the values of naked subsets (k squares which
+        could only have k values between them) from the other squares of the zone. Hidden
+        subsets are only looked for in zones which must hold every value.
+        """
+        for z in zones:
+            zone = self.zones[z]
+            table = self.__candidateTable__(z)
+            n_changes = self.n_changes
+            hidden = zone.subsets(k, self.squares, hidden=True, table=table) if self.zone_complete[z] else []
+            for squares, values_mask in hidden:
+                for square in squares:
+                    if square.mask & ~values_mask:
+                        self.__setMask__(self.square_indices[square.location()], square.mask & values_mask)
+                        square.conjugate = k
+
+            if self.n_changes!=n_changes:
+                table = self.__candidateTable__(z)
+
+            n_unknown = len([mask for mask in table[1] if self.mask_counts[mask]>1])
+            if k>=n_unknown:
+                continue
+
+            for squares, values_mask in zone.subsets(k, self.squares, hidden=False, table=table):
+                for p in self.zone_cells[z]:
+                    square = self.squares[p]
+                    if square in squares or not square.mask & values_mask or square.isKnown():
+                        continue
+
+                    self.__setMask__(p, square.mask & ~values_mask)
 
-    def __assignPairValues__(self):
+    def __assignPairValues__(self, zones):
         """
         For pairs of squares which must contain two values, remove other possibilities.
         """
-        for zone in self.zones:
-            pairs = zone.pairSquares(self.squares)
-            for location in pairs.keys():
-                for square in self.squares:
-                    if square.location()==location:
-                        if not square.isPair():
-                            #print 'Assign pair\t', location, ':', square.values, '-->', 
-                            square.values = pairs[location]
-                            square.conjugate = 2
-                            #print square.values
+        self.__assignSubsetValues__(zones, 2)
                             
-    def __assignTripleValues__(self):
+    def __assignTripleValues__(self, zones):
         """
         For triples of squares which must contain two or three values, remove other possibilities.
         """
-        for zone in self.zones:
-            triples = zone.tripleSquares(self.squares)
-            for location in triples.keys():
-                for square in self.squares:
-                    if square.location()==location:
-                        if not square.isTriple():
-                            #print 'Assign triple\t', location, ':', square.values, '-->', 
-                            square.values = triples[location]
-                            square.conjugate = 3
-                            #print square.values
+        self.__assignSubsetValues__(zones, 3)
 
-    def __assignQuadrupleValues__(self):
+    def __assignQuadrupleValues__(self, zones):
         """
         For quadruples of squares which must contain two, three or four values, remove other possibilities.
         """
-        for zone in self.zones:
-            quadruples = zone.quadrupleSquares(self.squares)
-            for location in quadruples.keys():
-                for square in self.squares:
-                    if square.location()==location:
-                        if not square.isQuadruple():
-                            #print 'Assign quadruple\t', location, ':', square.values, '-->', 
-                            square.values = quadruples[location]
-                            square.conjugate = 4
-                            #print square.values
+        self.__assignSubsetValues__(zones, 4)
 
-    def __assignConjugateValues__(self):
+    def __assignIntersectionValues__(self, zones):
         """
+        Where the possible squares of a value in one zone all lie in its intersection with a
+        second zone, remove the value from the rest of the second zone: pointing (from a box to
+        a row or column) and claiming (from a row or column to a box), for each intersection of
+        the given zones. The first zone must hold every value.
         """
-        self.__assignPairValues__()
-        self.__assignTripleValues__()
-        self.__assignQuadrupleValues__()
-        
-    def __removeKnownConjugates__(self):
+        squares = self.squares
+        crossings = set()
+        for z in zones:
+            crossings.update(self.zone_crossings[z])
+
+        for i in crossings:
+            a, b, shared, a_rest, b_rest = self.intersections[i]
+            shared_mask = 0
+            for k in shared:
+                shared_mask |= squares[k].mask
+
+            a_mask = 0
+            for k in a_rest:
+                a_mask |= squares[k].mask
+
+            b_mask = 0
+            for k in b_rest:
+                b_mask |= squares[k].mask
+
+            if self.zone_complete[a]:
+                self.__removeMaskFrom__(b_rest, shared_mask & ~a_mask)
+
+            if self.zone_complete[b]:
+                self.__removeMaskFrom__(a_rest, shared_mask & ~b_mask)
+
+    def __assignFishValues__(self, zones, k):
         """
+        For each value, where the possible squares of the value in k rows lie in only k columns,
+        remove the value from the other squares of those columns, and likewise with rows and
+        columns swapped: X-Wing (k=2), Swordfish (3) and Jellyfish (4). A fish spans the board, so
+        every row and column is examined whenever any of the given zones has changed.
+
+        The positions of a value in a base zone are read from the zone value tables, as the
+        squares of a row are in column order and those of a column in row order. Known squares
+        need not be left out: the strategies only run once the known values have been removed
+        from their peers, so a value known in a base zone has one position there and is skipped.
         """
-        for zone in self.zones:
-            squares = zone.squares(self.squares)
-            known_values = []
-            for square in squares:
-                if square.conjugate>0:
-                    known_values.extend(square.values)
+        mask_counts = self.mask_counts
+        counts = self.value_counts
+        positions = self.value_positions
+        n_values = len(self.values)
+        for base, cover, cells in self.fish_grids:
+            for v in self.values:
+                lines = [i for i in range(len(base)) if counts[base[i] * n_values + v - 1]>=2 and counts[base[i] * n_values + v - 1]<=k]
+                if len(lines)<k:
+                    continue
 
-            for square in squares:
-                if square.conjugate==0:
-                    #print 'Remove known conjugates\t', square.location(), ':', square.values, '-->', 
-                    square.removeValues(known_values)
-                    #print square.values
-        
-                        
-    #  p u b l i c   m e t h o d s
-    def solve(self):
+                value_mask = valueMask(v)
+                for indices, union in maskSubsets([positions[base[i] * n_values + v - 1] for i in lines], k, mask_counts):
+                    fish = [lines[i] for i in indices]
+                    for j in range(len(cover)):
+                        if union & (1 << j):
+                            self.__removeMaskFrom__([cells[i][j] for i in range(len(base)) if i not in fish], value_mask)
+
+    def __assignXWingValues__(self, zones):
+        """
+        Remove the values of X-Wings: two rows (columns) with a value only in the same two columns (rows).
+        """
+        self.__assignFishValues__(zones, 2)
+
+    def __assignSwordfishValues__(self, zones):
+        """
+        Remove the values of Swordfish: three rows (columns) with a value only in the same three columns (rows).
+        """
+        self.__assignFishValues__(zones, 3)
+
+    def __assignJellyfishValues__(self, zones):
+        """
+        Remove the values of Jellyfish: four rows (columns) with a value only in the same four columns (rows).
+        """
+        self.__assignFishValues__(zones, 4)
+
+    def __propagate__(self):
+        """
+        Run the strategies until they make no further change. Known values are removed from
+        their peers first; then the zone strategies are tried in the scheduler's order, cheapest
+        per value eliminated first, going back to the start as soon as one makes a change and
+        escalating to the next only when one stalls. Each zone strategy only re-examines the
+        zones which have changed since it last ran.
+        """
+        n_passes = 0
+        n_zones = len(self.zones)
         while True:
-            n_known = self.__countKnownSquares__()
-            while True:
-                __n_known__ = self.__countKnownSquares__()
-                self.__removeKnownValues__()
-                self.__assignUniqueValues__()
+            n_passes += 1
+            if self.budget is not None:
+                self.budget.passed()
+
+            self.__runStrategy__(self.__removeKnownValues__)
+            zone_changes = self.zone_changes
+            for name, method in self.scheduler.ladder(self.subset_sizes):
+                seen = self.zone_seen.setdefault(name, [-1] * n_zones)
+                zones = [z for z in range(n_zones) if seen[z]!=zone_changes[z]]
+                if not zones:
+                    continue
+
+                for z in zones:
+                    seen[z] = zone_changes[z]
 
-                if __n_known__==self.__countKnownSquares__():
+                n_changes = self.n_changes
+                self.__runScheduled__(name, method, zones)
+                if self.n_changes!=n_changes:
                     break
-                
-            if n_known==self.__countKnownSquares__():
-                while True:
-                    __n_possible__ = self.__countPossibleValues__()
-                    self.__assignConjugateValues__()
-                    self.__removeKnownConjugates__()
-                    self.__assignUniqueValues__()
-                    self.__removeKnownValues__()
-
-                    if __n_possible__==self.__countPossibleValues__():
-                        break
-            
-            if self.__isSolved__(): 
-                self.draw()
+            else:
                 break
 
-            if n_known==self.__countKnownSquares__():
+        return n_passes
+                        
+    def __search__(self):
+        """
+        Search depth first from the current, propagated, possible values, yielding whenever the
+        board holds a solution. Each branch sets the unknown square with the fewest possible
+        values to one of them and propagates; it is abandoned as soon as a zone it changed is
+        inconsistent, and undone through the trail, so a branch costs the changes it made
+        rather than a copy of the board. The caller must have taken a checkpoint.
+        """
+        stack = [] # (checkpoint before the choice, square index, values still to try)
+        consistent = self.__isConsistent__()
+        while True:
+            if consistent:
+                k = self.__branchSquare__()
+                if k is None:
+                    yield
+                else:
+                    stack.append((self.checkpoint(), k, list(self.mask_values[self.squares[k].mask])))
+
+            while stack and not stack[-1][2]:
+                stack.pop()
+
+            if not stack:
+                return
+
+            if self.budget is not None:
+                self.budget.node()
+
+            checkpoint, k, values = stack[-1]
+            self.rollback(checkpoint)
+            self.__setMask__(k, valueMask(values.pop(0)))
+            self.__propagate__()
+            consistent = self.__isConsistent__(self.__trailZones__(checkpoint))
+
+    def __solveSearch__(self):
+        """
+        Complete the board from the current possible values by depth first search. Return
+        'True' if solved; otherwise, or if the budget runs out, the board is left as it was.
+        """
+        own_trail = self.trail is None
+        start = self.checkpoint()
+        try:
+            for solution in self.__search__():
+                return True
+
+            self.rollback(start)
+            return False
+        except budgetExceeded:
+            self.rollback(start)
+            raise
+        finally:
+            if own_trail:
+                self.trail = None
+
+    def __exactCoverRows__(self):
+        """
+        Return the exact cover matrix of the current possible values as a number of columns, a
+        number of primary columns and a list of rows, with the (square index, value) choice made
+        by each row. There is a column for each square and for each value of each zone; those of
+        zones which hold each value at most once are secondary, after the primary columns.
+        """
+        n_values = len(self.values)
+        zone_order = [z for z in range(len(self.zones)) if self.zone_complete[z]]
+        n_primary = self.n_squares + len(zone_order) * n_values
+        zone_order += [z for z in range(len(self.zones)) if not self.zone_complete[z]]
+        zone_columns = [0] * len(self.zones) # the column of value v of zone z is zone_columns[z] + v - 1
+        for i in range(len(zone_order)):
+            zone_columns[zone_order[i]] = self.n_squares + i * n_values
+
+        rows = []
+        choices = []
+        for k in range(self.n_squares):
+            for v in self.mask_values[self.squares[k].mask]:
+                columns = [k]
+                for z in self.cell_zones[k]:
+                    columns.append(zone_columns[z] + v - 1)
+
+                rows.append(columns)
+                choices.append((k, v))
+
+        return self.n_squares + len(self.zones) * n_values, n_primary, rows, choices
+
+    def __solveExactCover__(self):
+        """
+        Complete the board from the current possible values with the exact cover solver. Return
+        the full grid as a list of values by square index, or 'None' if there is no solution.
+        """
+        n_columns, n_primary, rows, choices = self.__exactCoverRows__()
+        solution = exactCover(n_columns, rows, n_primary).solve(self.budget.node if self.budget is not None else None)
+        if solution is None:
+            return None
+
+        grid = [0] * self.n_squares
+        for r in solution:
+            k, v = choices[r]
+            grid[k] = v
+
+        for k in range(self.n_squares):
+            self.__setMask__(k, valueMask(grid[k]))
+
+        return grid
+
+    def __branches__(self):
+        """
+        Return the states of the branches of the board, as 'branches()' does, counting each
+        branch as a search node of the budget.
+        """
+        self.__propagate__()
+        if not self.__isConsistent__():
+            return []
+
+        k = self.__branchSquare__()
+        if k is None:
+            return []
+
+        own_trail = self.trail is None
+        start = self.checkpoint()
+        states = []
+        try:
+            for v in self.mask_values[self.squares[k].mask]:
+                if self.budget is not None:
+                    self.budget.node()
+
+                self.__setMask__(k, valueMask(v))
+                self.__propagate__()
+                if self.__isConsistent__(self.__trailZones__(start)):
+                    states.append(self.state())
+
+                self.rollback(start)
+        finally:
+            self.rollback(start)
+            if own_trail:
+                self.trail = None
+
+        return states
+
+    def __lineSquares__(self):
+        """
+        Return the squares in line order, row by row.
+        """
+        n = self.size[1]
+        return [self.squares[(l % n) * n + l // n] for l in range(self.n_squares)]
+
+    #  p u b l i c   m e t h o d s
+    def reset(self, given_squares):
+        """
+        Set the board to a new puzzle of the same size, {(x, y) : [values]}, reusing its
+        squares, zones and index rather than building a new board.
+        """
+        for square in self.squares:
+            square.mask = valuesToMask(given_squares.get((square.x, square.y), self.values))
+            square.conjugate = 0
+
+        self.trail = None
+        self.__resetPropagation__()
+
+    def checkpoint(self):
+        """
+        Return a checkpoint of the possible values, for 'rollback()'. From the first checkpoint
+        every change is recorded on the trail, so this takes constant time. Checkpoints should
+        be taken when propagation is complete.
+        """
+        if self.trail is None:
+            self.trail = []
+
+        return len(self.trail)
+
+    def rollback(self, checkpoint):
+        """
+        Undo every change of possible values since the checkpoint, in time proportional to the
+        number of changes. The running counts and zone value tables are restored and nothing is
+        left queued for propagation; the observer is not told.
+        """
+        trail = self.trail
+        squares = self.squares
+        mask_counts = self.mask_counts
+        cell_zones = self.cell_zones
+        zone_changes = self.zone_changes
+        seen_lists = self.zone_seen.values()
+        self.table_masks = None
+        while len(trail)>checkpoint:
+            k, old_mask = trail.pop()
+            square = squares[k]
+            mask = square.mask
+            self.n_possible += mask_counts[old_mask] - mask_counts[mask]
+            self.n_known += (mask_counts[old_mask]==1) - (mask_counts[mask]==1)
+            square.mask = old_mask
+            self.__updateZoneValues__(k, mask, old_mask)
+            for z in cell_zones[k]:
+                for seen in seen_lists:
+                    seen[z] = zone_changes[z]
+
+        self.known_queue = []
+
+    def solve(self, engine='logic', quiet=True, deadline=None, max_nodes=None, max_passes=None):
+        """
+        Solve the board with the logical strategies. With engine 'dlx', a board on which the
+        strategies stall is completed by the exact cover solver, and with engine 'search' by
+        depth first search with propagation (see 'solutions()'). Nothing is printed unless
+        'quiet' is cleared, when the result is drawn. Return 'True' if solved.
+
+        The solve may be limited by a wall clock 'deadline' (a 'time.time()' value), and by the
+        most search nodes and propagation passes. When a limit is passed the solve stops at the
+        next pass or node, leaving the possible values found so far, none of which rule out a
+        solution. How the solve ended is left in 'status': 'solved', 'stalled' (the strategies
+        alone could not finish), 'unsolvable', 'timeout' or 'budget' (nodes or passes).
+        """
+        if engine not in solve_engines:
+            raise ValueError("unknown solve engine '%s', expected one of %s" % (engine, solve_engines))
+
+        start = time.time()
+        budget = self.__setBudget__(deadline, max_nodes, max_passes)
+        n_passes = 0
+        try:
+            self.__resetPropagation__()
+            n_passes = self.__propagate__()
+            if not self.__isConsistent__():
+                self.status = 'unsolvable'
+            elif self.__isSolved__():
+                self.status = 'solved'
+            elif engine=='logic':
+                self.status = 'stalled'
+            else:
+                if engine=='dlx':
+                    self.__runStrategy__(self.__solveExactCover__)
+                else:
+                    self.__runStrategy__(self.__solveSearch__)
+
+                self.status = 'solved' if self.__isSolved__() else 'unsolvable'
+        except budgetExceeded, e:
+            self.status = 'timeout' if e.limit=='deadline' else 'budget'
+            n_passes = self.budget.n_passes
+        finally:
+            self.budget = budget
+
+        if self.observer is not None:
+            self.observer.finished(engine, self.__isSolved__(), n_passes, time.time() - start)
+
+        if not quiet:
+            if not self.__isSolved__():
                 print 'Failed'
-                self.draw()
-                break
+
+            self.draw()
+
+        return self.__isSolved__()
+
+    def solutions(self, limit=None, deadline=None, max_nodes=None, max_passes=None):
+        """
+        Yield each solution of the board as a puzzle line, stopping after 'limit' solutions if
+        given. The search is depth first, trying each value of the unknown square with the
+        fewest possible values and running the logical strategies after every choice, so a
+        branch is abandoned as soon as propagation contradicts it. The board is put back as it
+        was when the search is exhausted or the generator is closed.
+
+        The search may be limited as 'solve()' is; when a limit is passed the board is put back
+        and 'budgetExceeded' raised, rather than the search seeming to be exhausted.
+        """
+        own_trail = self.trail is None
+        start = self.checkpoint()
+        budget = self.__setBudget__(deadline, max_nodes, max_passes)
+        n_found = 0
+        try:
+            self.__resetPropagation__()
+            self.__propagate__()
+            for solution in self.__search__():
+                yield self.line()
+                n_found += 1
+                if limit is not None and n_found>=limit:
+                    return
+        finally:
+            self.rollback(start)
+            self.budget = budget
+            if own_trail:
+                self.trail = None
+
+    def countSolutions(self, limit=None, deadline=None, max_nodes=None, max_passes=None):
+        """
+        Return the number of solutions of the board, counting no further than 'limit' if given.
+        The count may be limited as 'solutions()' is, raising 'budgetExceeded'.
+        """
+        n_found = 0
+        for line in self.solutions(limit, deadline, max_nodes, max_passes):
+            n_found += 1
+
+        return n_found
+
+    def isUnique(self, deadline=None, max_nodes=None, max_passes=None):
+        """
+        Return 'True' if the board has exactly one solution, searching no further than a second.
+        The search may be limited as 'solutions()' is, raising 'budgetExceeded'.
+        """
+        return self.countSolutions(2, deadline, max_nodes, max_passes)==1
+
+    def branches(self, deadline=None, max_nodes=None, max_passes=None):
+        """
+        Propagate the board, then return the packed states (see 'state()') of the boards reached
+        by setting the unknown square with the fewest possible values to each of them and
+        propagating, leaving out those which contradict themselves. Return an empty list if the
+        board contradicts itself or every square is known. The board is left propagated.
+
+        The work may be limited as 'solve()' is, each branch counting as a search node; when a
+        limit is passed 'budgetExceeded' is raised, with the board left propagated as far as
+        it got.
+        """
+        budget = self.__setBudget__(deadline, max_nodes, max_passes)
+        try:
+            return self.__branches__()
+        finally:
+            self.budget = budget
+
+    def valueFrequency(self, z, f):
+        """
+        Return a dictionary of the values with only 'f' possible locations in zone z, as
+        'sudokuZone.valueFrequency()' does, read from the zone value tables: {value : [squares]}
+        """
+        counts = self.value_counts
+        positions = self.value_positions
+        cells = self.zone_cells[z]
+        slot = z * len(self.values) - 1
+        sets = {}
+        for v in self.values:
+            if counts[slot + v]==f:
+                sets[v] = [self.squares[cells[i]] for i in range(len(cells)) if positions[slot + v] & (1 << i)]
+
+        return sets
             
-    def draw(self):
-        for j in range(self.size[1]):
-            print '',
-            for i in range(self.size[0]):
-                value = '-'
-                for square in self.squares:
-                    if square.location()==(i, j):
-                        if square.isKnown():
-                            value = square.values[0]
+    def format(self, style='grid'):
+        """
+        Return the board as a string, in one of the 'board_formats':
+            'grid'          one row per line, with '-' for an unknown square
+            'line'          a puzzle line, row by row, with '.' for an unknown square
+            'candidates'    the possible values of each square, boxes separated by rules
+        """
+        if style not in board_formats:
+            raise ValueError("unknown board format '%s', expected one of %s" % (style, board_formats))
 
-                print value,
-            print ''
+        n_columns, n_rows = self.size
+        rows = [[None] * n_columns for j in range(n_rows)]
+        for square in self.squares:
+            rows[square.y][square.x] = square
 
-        print ''
+        if style=='line':
+            return ''.join([value_chars[square.value() - 1] if square.isKnown() else '.' for row in rows for square in row])
 
+        if style=='grid':
+            lines = [' ' + ' '.join([value_chars[square.value() - 1] if square.isKnown() else '-' for square in row]) for row in rows]
+            return '\n'.join(lines) + '\n'
 
-#  m a i n   e x e c u t i o n
-if __name__ == "__main__":
-    easy = {(0, 1) : [2],
-            (0, 5) : [7],
-            (1, 2) : [6],
-            (1, 6) : [4],
-            (1, 8) : [2],
-            (2, 1) : [4],
-            (2, 2) : [9],
-            (2, 3) : [1],
-            (2, 6) : [3],
-            (2, 7) : [8],
-            (3, 0) : [3],
-            (3, 4) : [4],
-            (3, 6) : [6],
-            (4, 3) : [7],
-            (4, 5) : [5],
-            (5, 2) : [7],
-            (5, 4) : [1],
-            (5, 8) : [9],
-            (6, 1) : [5],
-            (6, 2) : [3],
-            (6, 5) : [6],
-            (6, 6) : [8],
-            (6, 7) : [1],
-            (7, 0) : [4],
-            (7, 2) : [8],
-            (7, 6) : [7],
-            (8, 3) : [2],
-            (8, 7) : [9]}
-
-    medium = {(0, 6) : [3],
-              (1, 1) : [7],
-              (1, 2) : [2],
-              (1, 5) : [1],
-              (1, 7) : [6],
-              (2, 0) : [3],
-              (2, 4) : [6],
-              (2, 5) : [9],
-              (2, 7) : [2],
-              (3, 1) : [8],
-              (3, 2) : [7],
-              (4, 2) : [5],
-              (4, 6) : [9],
-              (5, 6) : [4],
-              (5, 7) : [1],
-              (6, 1) : [9],
-              (6, 3) : [8],
-              (6, 4) : [7],
-              (6, 8) : [6],
-              (7, 1) : [6],
-              (7, 3) : [5],
-              (7, 6) : [7],
-              (7, 7) : [3],
-              (8, 2) : [1]}
-    
-    hard = {(0, 1) : [2],
-            (0, 6) : [4],
-            (1, 0) : [4],
-            (1, 3) : [7],
-            (1, 7) : [9],
-            (2, 2) : [6],
-            (2, 4) : [2],
-            (2, 8) : [7],
-            (3, 3) : [3],
-            (3, 8) : [5],
-            (4, 0) : [9],
-            (4, 4) : [7],
-            (4, 8) : [6],
-            (5, 0) : [1],
-            (5, 5) : [2],
-            (6, 0) : [6],
-            (6, 4) : [4],
-            (6, 6) : [1],
-            (7, 1) : [5],
-            (7, 5) : [6],
-            (7, 8) : [9],
-            (8, 2) : [3],
-            (8, 7) : [8]}
-
-    very_hard = {(1, 1) : [1],
-                 (1, 4) : [8],
-                 (1, 5) : [7],
-                 (1, 6) : [5],
-                 (2, 2) : [2],
-                 (2, 5) : [6],
-                 (2, 7) : [1],
-                 (3, 3) : [3],
-                 (3, 6) : [4],
-                 (3, 7) : [9],
-                 (4, 1) : [7],
-                 (4, 4) : [4],
-                 (4, 7) : [6],
-                 (5, 1) : [4],
-                 (5, 2) : [8],
-                 (5, 5) : [5],
-                 (6, 1) : [2],
-                 (6, 3) : [8],
-                 (6, 6) : [6],
-                 (7, 2) : [3],
-                 (7, 3) : [2],
-                 (7, 4) : [9],
-                 (7, 7) : [4]}
-
-    very_very_hard = {(0, 1) : [9],
-                      (0, 2) : [6],
-                      (0, 3) : [7],
-                      (0, 4) : [8],
-                      (0, 7) : [1],
-                      (1, 0) : [8],
-                      (1, 6) : [5],
-                      (2, 5) : [3],
-                      (3, 2) : [7],
-                      (3, 3) : [2],
-                      (3, 8) : [9],
-                      (4, 1) : [3],
-                      (4, 4) : [7],
-                      (4, 7) : [2],
-                      (5, 0) : [9],
-                      (5, 5) : [6],
-                      (5, 6) : [8],
-                      (6, 3) : [5],
-                      (7, 2) : [4],
-                      (7, 8) : [5],
-                      (8, 1) : [6],
-                      (8, 4) : [1],
-                      (8, 5) : [2],
-                      (8, 6) : [3],
-                      (8, 7) : [4]}
-
-    seven_star = {(0, 3) : [2],
-                  (0, 7) : [8],
-                  (1, 0) : [1],
-                  (1, 2) : [7],
-                  (1, 8) : [9],
-                  (2, 0) : [2],
-                  (2, 4) : [3],
-                  (2, 6) : [1],
-                  (3, 1) : [3],
-                  (3, 3) : [6],
-                  (3, 6) : [7],
-                  (4, 1) : [4],
+        width = max([square.count() for square in self.squares])
+        box_columns, box_rows = self.box_size
+        lines = []
+        for j in range(n_rows):
+            if j and j % box_rows==0:
+                lines.append('+'.join(['-' * ((width + 1) * box_columns + 1)] * (n_columns // box_columns)))
+
+            cells = [''.join([value_chars[v - 1] for v in square.values]).center(width) for square in rows[j]]
+            boxes = [' ' + ' '.join(cells[b:b + box_columns]) + ' ' for b in range(0, n_columns, box_columns)]
+            lines.append('|'.join(boxes))
+
+        return '\n'.join(lines) + '\n'
+
+    def draw(self, style='grid', stream=None):
+        """
+        Write the board to 'stream' (by default stdout), formatted as by 'format()'.
+        """
+        if stream is None:
+            stream = sys.stdout
+
+        stream.write(self.format(style) + '\n')
+
+    def line(self):
+        """
+        Return the board as a puzzle line, row by row, with '.' for an unknown square.
+        """
+        return self.format('line')
+
+    def state(self):
+        """
+        Return the possible values of every square, row by row, packed into 'stateSize(order)'
+        bytes (see 'masksToBytes'), for storage or transfer to another process.
+        """
+        return masksToBytes([square.mask for square in self.__lineSquares__()], len(self.values))
+
+    def loadState(self, data):
+        """
+        Set the possible values of every square from a packed state, any buffer of at least
+        'stateSize(order)' bytes such as a 'memoryview' slice of shared memory, and queue the
+        board for propagation as 'reset()' does.
+        """
+        masks = bytesToMasks(data, self.n_squares, len(self.values))
+        squares = self.__lineSquares__()
+        for l in range(self.n_squares):
+            squares[l].mask = masks[l]
+            squares[l].conjugate = 0
+
+        self.trail = None
+        self.__resetPropagation__()
+
+    def valueBytes(self):
+        """
+        Return the board as one byte per square, row by row: the value of a known square, or 0.
+        """
+        mask_counts = self.mask_counts
+        values = bytearray(self.n_squares)
+        squares = self.__lineSquares__()
+        for l in range(self.n_squares):
+            mask = squares[l].mask
+            if mask_counts[mask]==1:
+                values[l] = mask.bit_length()
+
+        return str(values)
+
+
+#  s t r a t e g i e s
+# the zone strategies of every board, with the estimated seconds of a call on a 9x9 board
+default_scheduler = strategyScheduler()
+default_scheduler.register('__assignUniqueValues__', 0.0002)
+default_scheduler.register('__assignIntersectionValues__', 0.0005, 1)
+default_scheduler.register('__assignPairValues__', 0.001, 2)
+default_scheduler.register('__assignXWingValues__', 0.001, 2)
+default_scheduler.register('__assignTripleValues__', 0.002, 3)
+default_scheduler.register('__assignSwordfishValues__', 0.002, 3)
+default_scheduler.register('__assignQuadrupleValues__', 0.004, 4)
+default_scheduler.register('__assignJellyfishValues__', 0.004, 4)
+
+
+#  p u z z l e s
+easy = {(0, 1) : [2],
+        (0, 5) : [7],
+        (1, 2) : [6],
+        (1, 6) : [4],
+        (1, 8) : [2],
+        (2, 1) : [4],
+        (2, 2) : [9],
+        (2, 3) : [1],
+        (2, 6) : [3],
+        (2, 7) : [8],
+        (3, 0) : [3],
+        (3, 4) : [4],
+        (3, 6) : [6],
+        (4, 3) : [7],
+        (4, 5) : [5],
+        (5, 2) : [7],
+        (5, 4) : [1],
+        (5, 8) : [9],
+        (6, 1) : [5],
+        (6, 2) : [3],
+        (6, 5) : [6],
+        (6, 6) : [8],
+        (6, 7) : [1],
+        (7, 0) : [4],
+        (7, 2) : [8],
+        (7, 6) : [7],
+        (8, 3) : [2],
+        (8, 7) : [9]}
+
+medium = {(0, 6) : [3],
+          (1, 1) : [7],
+          (1, 2) : [2],
+          (1, 5) : [1],
+          (1, 7) : [6],
+          (2, 0) : [3],
+          (2, 4) : [6],
+          (2, 5) : [9],
+          (2, 7) : [2],
+          (3, 1) : [8],
+          (3, 2) : [7],
+          (4, 2) : [5],
+          (4, 6) : [9],
+          (5, 6) : [4],
+          (5, 7) : [1],
+          (6, 1) : [9],
+          (6, 3) : [8],
+          (6, 4) : [7],
+          (6, 8) : [6],
+          (7, 1) : [6],
+          (7, 3) : [5],
+          (7, 6) : [7],
+          (7, 7) : [3],
+          (8, 2) : [1]}
+
+hard = {(0, 1) : [2],
+        (0, 6) : [4],
+        (1, 0) : [4],
+        (1, 3) : [7],
+        (1, 7) : [9],
+        (2, 2) : [6],
+        (2, 4) : [2],
+        (2, 8) : [7],
+        (3, 3) : [3],
+        (3, 8) : [5],
+        (4, 0) : [9],
+        (4, 4) : [7],
+        (4, 8) : [6],
+        (5, 0) : [1],
+        (5, 5) : [2],
+        (6, 0) : [6],
+        (6, 4) : [4],
+        (6, 6) : [1],
+        (7, 1) : [5],
+        (7, 5) : [6],
+        (7, 8) : [9],
+        (8, 2) : [3],
+        (8, 7) : [8]}
+
+very_hard = {(1, 1) : [1],
+             (1, 4) : [8],
+             (1, 5) : [7],
+             (1, 6) : [5],
+             (2, 2) : [2],
+             (2, 5) : [6],
+             (2, 7) : [1],
+             (3, 3) : [3],
+             (3, 6) : [4],
+             (3, 7) : [9],
+             (4, 1) : [7],
+             (4, 4) : [4],
+             (4, 7) : [6],
+             (5, 1) : [4],
+             (5, 2) : [8],
+             (5, 5) : [5],
+             (6, 1) : [2],
+             (6, 3) : [8],
+             (6, 6) : [6],
+             (7, 2) : [3],
+             (7, 3) : [2],
+             (7, 4) : [9],
+             (7, 7) : [4]}
+
+very_very_hard = {(0, 1) : [9],
+                  (0, 2) : [6],
+                  (0, 3) : [7],
+                  (0, 4) : [8],
+                  (0, 7) : [1],
+                  (1, 0) : [8],
+                  (1, 6) : [5],
+                  (2, 5) : [3],
+                  (3, 2) : [7],
+                  (3, 3) : [2],
+                  (3, 8) : [9],
+                  (4, 1) : [3],
                   (4, 4) : [7],
-                  (4, 7) : [5],
-                  (5, 2) : [5],
-                  (5, 5) : [4],
-                  (5, 7) : [3],
-                  (6, 2) : [4],
-                  (6, 4) : [8],
-                  (6, 8) : [3],
-                  (7, 0) : [3],
-                  (7, 6) : [2],
-                  (7, 8) : [1],
+                  (4, 7) : [2],
+                  (5, 0) : [9],
+                  (5, 5) : [6],
+                  (5, 6) : [8],
+                  (6, 3) : [5],
+                  (7, 2) : [4],
+                  (7, 8) : [5],
                   (8, 1) : [6],
-                  (8, 5) : [9]}
-    
-    #b = sudokuBoard(easy)
-    b = sudokuBoard(medium)
-    #b = sudokuBoard(hard)
-    #b = sudokuBoard(very_hard)
-    #b = sudokuBoard(very_very_hard)
-    #b = sudokuBoard(seven_star)
-    b.solve()
+                  (8, 4) : [1],
+                  (8, 5) : [2],
+                  (8, 6) : [3],
+                  (8, 7) : [4]}
+
+seven_star = {(0, 3) : [2],
+              (0, 7) : [8],
+              (1, 0) : [1],
+              (1, 2) : [7],
+              (1, 8) : [9],
+              (2, 0) : [2],
+              (2, 4) : [3],
+              (2, 6) : [1],
+              (3, 1) : [3],
+              (3, 3) : [6],
+              (3, 6) : [7],
+              (4, 1) : [4],
+              (4, 4) : [7],
+              (4, 7) : [5],
+              (5, 2) : [5],
+              (5, 5) : [4],
+              (5, 7) : [3],
+              (6, 2) : [4],
+              (6, 4) : [8],
+              (6, 8) : [3],
+              (7, 0) : [3],
+              (7, 6) : [2],
+              (7, 8) : [1],
+              (8, 1) : [6],
+              (8, 5) : [9]}
+
+example_puzzles = [('easy', easy),
+                   ('medium', medium),
+                   ('hard', hard),
+                   ('very_hard', very_hard),
+                   ('very_very_hard', very_very_hard),
+                   ('seven_star', seven_star)]
+
+
+#  m a i n   e x e c u t i o n
+if __name__ == "__main__":
+    #b = sudokuBoard(easy, quiet=False)
+    b = sudokuBoard(medium, quiet=False)
+    #b = sudokuBoard(hard, quiet=False)
+    #b = sudokuBoard(very_hard, quiet=False)
+    #b = sudokuBoard(very_very_hard, quiet=False)
+    #b = sudokuBoard(seven_star, quiet=False)
+    b.solve(quiet=False)
@@ -0,0 +1,228 @@
+#  d o c s t r i n g s
+"""
+Validity-preserving transformations of sudoku puzzles.
+
+A transform is a tuple (columns, rows, transpose, values). The square at (x, y) of the result
+is taken from square (columns[x], rows[y]) of the original, which is first reflected in the
+main diagonal if 'transpose' is set, and value v becomes values[v - 1]. Columns may only be
+reordered within their stack and stacks as a whole (likewise rows within bands), so every
+transform maps a valid puzzle to an equivalent one of the same difficulty.
+"""
+
+
+#  d e p e n d e n c i e s
+from itertools import islice, permutations, product
+
+from sudoku import sudoku_values
+
+
+#  v a r i a b l e s
+box_size = 3
+canonical_limit = 1024 # most row and column orders compared when the invariants leave ties
+
+
+#  f u n c t i o n s
+def randomOrder(rng):
+    """
+    Return a random order of the rows (or columns) which keeps each band (stack) together.
+    """
+    bands = list(range(len(sudoku_values) // box_size))
+    rng.shuffle(bands)
+    order = []
+    for band in bands:
+        lines = list(range(band * box_size, (band + 1) * box_size))
+        rng.shuffle(lines)
+        order.extend(lines)
+
+    return order
+
+def randomTransform(rng):
+    """
+    Return a random transform, drawn with the 'random.Random' instance 'rng'.
+    """
+    values = list(sudoku_values)
+    rng.shuffle(values)
+    return (randomOrder(rng), randomOrder(rng), rng.random()<0.5, values)
+
+def inverseTransform(transform):
+    """
+    Return the transform which undoes 'transform'.
+    """
+    columns, rows, transpose, values = transform
+    inverse_columns = [0] * len(columns)
+    inverse_rows = [0] * len(rows)
+    for i in range(len(columns)):
+        inverse_columns[columns[i]] = i
+
+    for j in range(len(rows)):
+        inverse_rows[rows[j]] = j
+
+    inverse_values = [0] * len(values)
+    for v in range(len(values)):
+        inverse_values[values[v] - 1] = v + 1
+
+    if transpose:
+        return (inverse_rows, inverse_columns, True, inverse_values)
+    else:
+        return (inverse_columns, inverse_rows, False, inverse_values)
+
+def transformSquares(given_squares, transform):
+    """
+    Return the given squares, {(x, y) : [values]}, moved and relabelled by 'transform'.
+    """
+    columns, rows, transpose, values = transform
+    inverse_columns = [0] * len(columns)
+    inverse_rows = [0] * len(rows)
+    for i in range(len(columns)):
+        inverse_columns[columns[i]] = i
+
+    for j in range(len(rows)):
+        inverse_rows[rows[j]] = j
+
+    transformed = {}
+    for (x, y), square_values in given_squares.items():
+        if transpose:
+            x, y = y, x
+
+        transformed[(inverse_columns[x], inverse_rows[y])] = [values[v - 1] for v in square_values]
+
+    return transformed
+
+def squaresToGrid(given_squares, transpose=False):
+    """
+    Return the given values of a puzzle as a list of rows of values, with 0 for an empty square.
+    """
+    n = len(sudoku_values)
+    grid = [[0] * n for j in range(n)]
+    for (x, y), values in given_squares.items():
+        if len(values)==1:
+            if transpose:
+                grid[x][y] = values[0]
+            else:
+                grid[y][x] = values[0]
+
+    return grid
+
+def lineKeys(grid):
+    """
+    Return the keys of the rows and of the columns of a grid, which no transform of the puzzle
+    changes: the number of given squares in the line, and the sorted numbers of given squares
+    in each crossing line through them.
+    """
+    n = len(grid)
+    row_counts = [len([v for v in row if v]) for row in grid]
+    column_counts = [len([y for y in range(n) if grid[y][x]]) for x in range(n)]
+    row_keys = []
+    for y in range(n):
+        row_keys.append((row_counts[y], tuple(sorted([column_counts[x] for x in range(n) if grid[y][x]]))))
+
+    column_keys = []
+    for x in range(n):
+        column_keys.append((column_counts[x], tuple(sorted([row_counts[y] for y in range(n) if grid[y][x]]))))
+
+    return row_keys, column_keys
+
+def tiedOrders(items, key):
+    """
+    Yield each order of the items sorted by key, taking every order of items with equal keys.
+    """
+    items = sorted(items, key=key)
+    groups = []
+    for item in items:
+        if groups and key(groups[-1][0])==key(item):
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+
+    for choice in product(*[list(permutations(group)) for group in groups]):
+        order = []
+        for group in choice:
+            order.extend(group)
+
+        yield order
+
+def lineOrders(keys):
+    """
+    Yield each order of the lines (rows or columns) which keeps bands (stacks) together and
+    sorts the bands, and the lines within each band, by key.
+    """
+    n_bands = len(keys) // box_size
+    bands = []
+    for b in range(n_bands):
+        bands.append(list(range(b * box_size, (b + 1) * box_size)))
+
+    band_key = lambda band: tuple(sorted([keys[line] for line in band]))
+    line_key = lambda line: keys[line]
+    for band_order in tiedOrders(bands, band_key):
+        for line_orders in product(*[list(tiedOrders(band, line_key)) for band in band_order]):
+            order = []
+            for lines in line_orders:
+                order.extend(lines)
+
+            yield order
+
+def relabel(grid, columns, rows, best):
+    """
+    Return the grid read in the given order of rows and columns, with its values numbered in
+    order of first appearance, and that numbering {value : label}. Return (None, None) as soon
+    as the result is known to come after 'best' in lexical order.
+    """
+    labels = {}
+    labelled = []
+    equal = best is not None
+    for y in rows:
+        row = grid[y]
+        for x in columns:
+            v = row[x]
+            if v:
+                label = labels.get(v)
+                if label is None:
+                    label = len(labels) + 1
+                    labels[v] = label
+            else:
+                label = 0
+
+            if equal:
+                best_label = best[len(labelled)]
+                if label>best_label:
+                    return None, None
+                elif label<best_label:
+                    equal = False
+
+            labelled.append(label)
+
+    return labelled, labels
+
+def canonicalForm(given_squares):
+    """
+    Return (canonical, transform) for a puzzle: the canonical form of its given squares, as a
+    line of 81 characters, and the transform which takes the puzzle to it. Equivalent puzzles
+    share a canonical form, unless their invariants tie so often that more than
+    'canonical_limit' orders would have to be compared, when the form is only canonical for
+    the orders tried.
+    """
+    best = None
+    best_transform = None
+    for transpose in [False, True]:
+        grid = squaresToGrid(given_squares, transpose)
+        row_keys, column_keys = lineKeys(grid)
+        orders = product(lineOrders(row_keys), lineOrders(column_keys))
+        for rows, columns in islice(orders, canonical_limit):
+            labelled, labels = relabel(grid, columns, rows, best)
+            if labelled is None or labelled==best:
+                continue
+
+            best = labelled
+            values = [0] * len(sudoku_values)
+            unused = len(labels) + 1
+            for v in sudoku_values:
+                if v in labels:
+                    values[v - 1] = labels[v]
+                else:
+                    values[v - 1] = unused
+                    unused += 1
+
+            best_transform = (list(columns), list(rows), transpose, values)
+
+    canonical = ''.join([str(label) if label else '.' for label in best])
+    return canonical, best_transform
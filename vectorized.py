@@ -0,0 +1,168 @@
+#  d o c s t r i n g s
+"""
+Constraint propagation over many 9x9 boards at once, using NumPy.
+
+N boards are held as an N x 81 array of candidate bit masks, square by square in the 81
+character line order. The eliminations of '__removeKnownValues__' (naked singles) and
+'__assignUniqueValues__' (hidden singles) are applied to every board together, as reductions
+over the zone index arrays of the board, until no board changes. Boards which stall are handed
+back to 'sudokuBoard' to finish.
+"""
+
+
+#  d e p e n d e n c i e s
+import time
+
+import numpy as np
+
+from sudoku import sudoku_values, all_values_mask, mask_counts, mask_values
+from workers import workerBoard
+
+
+#  v a r i a b l e s
+n_values = len(sudoku_values)
+value_bits = (1 << np.arange(n_values)).astype(np.uint16)
+popcount = np.array(mask_counts, dtype=np.uint8)
+lowest_bit = np.array([0] + [m & -m for m in range(1, all_values_mask + 1)], dtype=np.uint16)
+index_arrays = {} # zone_cells and cell_zones in line order, built on first use
+
+# board status returned by propagate()
+contradiction = -1
+stalled = 0
+solved = 1
+
+
+#  f u n c t i o n s
+def indexArrays():
+    """
+    Return the (zone_cells, cell_zones, line_of) index arrays, where 'line_of' maps a board
+    square index to its position in the 81 character line.
+    """
+    if not index_arrays:
+        board = workerBoard()
+        line_of = [(k % n_values) * n_values + k // n_values for k in range(board.n_squares)]
+
+        zone_cells = [[line_of[k] for k in cells] for cells in board.zone_cells]
+        cell_zones = [None] * board.n_squares
+        for k in range(board.n_squares):
+            cell_zones[line_of[k]] = board.cell_zones[k]
+
+        index_arrays['zone_cells'] = np.array(zone_cells, dtype=np.intp)
+        index_arrays['cell_zones'] = np.array(cell_zones, dtype=np.intp)
+        index_arrays['line_of'] = line_of
+
+    return index_arrays['zone_cells'], index_arrays['cell_zones'], index_arrays['line_of']
+
+def linesToMasks(lines):
+    """
+    Return the N x 81 mask array of a list of puzzle lines, which must be valid 81 character
+    lines with '0' or '.' for an empty square.
+    """
+    chars = np.frombuffer(''.join(lines).encode('ascii'), dtype=np.uint8)
+    chars = chars.reshape(len(lines), n_values * n_values)
+    digits = chars.astype(np.int16) - ord('0')
+    given = (digits>=1) & (digits<=n_values)
+    shifts = np.where(given, digits - 1, 0).astype(np.uint16)
+    return np.where(given, np.left_shift(np.uint16(1), shifts), np.uint16(all_values_mask)).astype(np.uint16)
+
+def masksToLine(masks):
+    """
+    Return the 81 character line of one board's masks, with '.' for an unknown square.
+    """
+    chars = []
+    for m in masks:
+        if mask_counts[m]==1:
+            chars.append(str(mask_values[m][0]))
+        else:
+            chars.append('.')
+
+    return ''.join(chars)
+
+def masksToSquares(masks):
+    """
+    Return one board's masks as the given squares of 'sudokuBoard': {(x, y) : [values]}
+    """
+    given_squares = {}
+    for l in range(len(masks)):
+        given_squares[(l % n_values, l // n_values)] = list(mask_values[masks[l]])
+
+    return given_squares
+
+def propagate(masks):
+    """
+    Apply naked and hidden singles to every board of an N x 81 mask array, in place, until no
+    board changes. Return an array of the status of each board: 'solved', 'stalled' or
+    'contradiction'.
+    """
+    zone_cells, cell_zones, line_of = indexArrays()
+    status = np.zeros(len(masks), dtype=np.int8)
+    active = np.arange(len(masks))
+    while active.size:
+        m = masks[active]
+
+        # naked singles : remove the known values of each zone from its other squares
+        known = popcount[m]==1
+        known_masks = np.where(known, m, 0).astype(np.uint16)
+        zone_known = np.bitwise_or.reduce(known_masks[:, zone_cells], axis=2)
+        peer_known = np.bitwise_or.reduce(zone_known[:, cell_zones], axis=2)
+        new = np.where(known, m, m & ~peer_known)
+
+        # hidden singles : assign a value with only one possible square in a zone
+        bits = (new[:, :, None] & value_bits)!=0
+        zone_counts = bits[:, zone_cells, :].sum(axis=2)
+        single = np.any((zone_counts==1)[:, cell_zones, :], axis=2) & bits
+        hidden = (single * value_bits).sum(axis=2).astype(np.uint16)
+        new = np.where((hidden!=0) & (popcount[new]>1), lowest_bit[hidden], new)
+
+        # a square with no value, two hidden singles, or a value with no square, is a contradiction
+        broken = ((new==0).any(axis=1) | (popcount[hidden]>1).any(axis=1) |
+                  (zone_counts==0).any(axis=(1, 2)))
+        masks[active] = new
+        status[active[broken]] = contradiction
+        changed = (new!=m).any(axis=1) & ~broken
+        active = active[changed]
+
+    counts = popcount[masks]
+    complete = (counts==1).all(axis=1) & (status!=contradiction)
+
+    # a complete board must have every value once in each zone
+    zone_values = np.bitwise_or.reduce(masks[:, zone_cells], axis=2)
+    valid = (zone_values==all_values_mask).all(axis=1)
+    status[complete & valid] = solved
+    status[complete & ~valid] = contradiction
+    return status
+
+def solveLines(lines, engine='dlx', timeout=None):
+    """
+    Solve a list of puzzle lines, propagating all boards together and finishing any stalled
+    board with 'sudokuBoard.solve()' on the board of this process, given up after 'timeout'
+    seconds if not 'None'. Return a (puzzle, solution, solved) tuple for each line, with an
+    empty solution for a line which could not be read.
+    """
+    readable = []
+    for line in lines:
+        readable.append(len(line)==n_values * n_values and all(c=='.' or c.isdigit() for c in line))
+
+    good_lines = [line for line, ok in zip(lines, readable) if ok]
+    masks = linesToMasks(good_lines) if good_lines else np.zeros((0, n_values * n_values), dtype=np.uint16)
+    status = propagate(masks)
+
+    results = []
+    i = 0
+    for line, ok in zip(lines, readable):
+        if not ok:
+            results.append((line, '', False))
+            continue
+
+        if status[i]==stalled:
+            board = workerBoard()
+            board.reset(masksToSquares(masks[i]))
+            deadline = time.time() + timeout if timeout is not None else None
+            is_solved = board.solve(engine=engine, deadline=deadline)
+            results.append((line, board.line(), is_solved))
+        else:
+            results.append((line, masksToLine(masks[i]), status[i]==solved))
+
+        i += 1
+
+    return results
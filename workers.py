@@ -0,0 +1,57 @@
+#  d o c s t r i n g s
+"""
+Helpers for the modules which spread their work over a pool of worker processes.
+"""
+
+
+#  d e p e n d e n c i e s
+from itertools import islice
+
+from sudoku import sudokuBoard, namedLayout
+
+
+#  v a r i a b l e s
+worker_boards = {} # the boards reused by this (worker) process, keyed by board layout
+
+
+#  f u n c t i o n s
+def workerBoard(order=3, layout=None):
+    """
+    Return the board of this process for puzzles of a layout (by default the standard layout of
+    the order), creating it on first use.
+    """
+    if layout is None:
+        layout = namedLayout('standard', order)
+
+    if layout.key not in worker_boards:
+        worker_boards[layout.key] = sudokuBoard({}, layout=layout)
+
+    return worker_boards[layout.key]
+
+def poolResults(pool, function, tasks, chunksize=1, ordered=True, slab_size=None):
+    """
+    Yield the result of a function of each task, run by a 'multiprocessing.Pool', in the order
+    of the tasks, or of completion within each slab if not 'ordered'. Tasks are handed to the
+    pool 'slab_size' at a time, if given, so that long iterators are never held in memory at
+    once. The pool is closed after the last result, or terminated if the caller stops early.
+    """
+    if slab_size is None:
+        slabs = [tasks]
+    else:
+        tasks = iter(tasks)
+        slabs = iter(lambda: list(islice(tasks, slab_size)), [])
+
+    try:
+        for slab in slabs:
+            if ordered:
+                results = pool.imap(function, slab, chunksize)
+            else:
+                results = pool.imap_unordered(function, slab, chunksize)
+
+            for result in results:
+                yield result
+
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()